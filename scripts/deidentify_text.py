@@ -3,7 +3,7 @@ import re
 from tqdm import tqdm
 import spacy
 import os
-from utils import load_spacy_model, deidentify_text
+from utils import load_spacy_model, deidentify_texts
 import argparse
 import multiprocessing
 import math
@@ -43,9 +43,10 @@ def deidentify_file(input_file, output_file, columns_to_deidentify, nlp, n_proce
             n_batches = math.ceil(n_rows / batch_size)
             n_proc_used = min(n_process, n_batches)
             print(f"Using batch_size={batch_size} for {n_rows} rows and n_process={n_proc_used} (max batches: {n_batches}).")
-            deidentified = []
-            for doc in tqdm(nlp.pipe(texts, batch_size=batch_size, n_process=n_proc_used), total=n_rows):
-                deidentified.append(deidentify_text(doc.text, nlp))
+            # spaCy runs once per text, over the text pydeidentify and the
+            # address patterns have already rewritten
+            deidentified = list(tqdm(deidentify_texts(texts, nlp, batch_size=batch_size, n_process=n_proc_used),
+                                     total=n_rows))
             deidentified_df[new_col] = deidentified
             deidentified_cols.append(col)
         else:
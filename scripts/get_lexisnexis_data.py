@@ -118,40 +118,55 @@ def get_lexisnexis_data(city):
     keyword_query = " OR ".join([f'"{keyword}"' for keyword in KEYWORDS])
     
     api = LexisNexisAPI(LEXISNEXIS_API_ID, LEXISNEXIS_API_KEY)
-    all_articles = []
-    seen_articles = set()
-    for source in city_sources:
-        # Query for each source
-        query = f'({keyword_query}) AND source("{source}")'
-        encoded_query = urllib.parse.quote(query)
-        print(f"\nQuery for LexisNexis API ({city}, {source}):")
-        print(f"https://solutions.nexis.com/wsapi/news-and-directories/news/?Search={encoded_query}")
-        articles = api.search_articles(query)
-        for article in articles:
-            title = article.get('Title', '')
-            date = article.get('Date', '')
-            unique_id = f"{title}|{date}"
-            if unique_id not in seen_articles:
-                seen_articles.add(unique_id)
-                # Add city source to article
-                article['City Source'] = source
-                all_articles.append(article)
-    print(f"\nTotal unique articles found: {len(all_articles)}")
-    
-    # Filter articles by date (between 1/1/2015 and 1/1/2025)
-    start_date = datetime(2015, 1, 1)
-    end_date = datetime(2025, 1, 1)
-    filtered_articles = api.filter_articles_by_date(all_articles, start_date=start_date, end_date=end_date)
-    print(f"Articles in date range: {len(filtered_articles)}")
     
     # Create output directory if it doesn't exist
     mapped_city = CITY_MAP.get(city, city)
     output_dir = f"data/{mapped_city}/newspaper"
     os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, "lexisnexis.csv")
+    
+    # Articles are written out batch by batch as they arrive, so only the
+    # dedup keys are held in memory. The file is built under a temporary name
+    # and only replaces lexisnexis.csv once every source has been fetched.
+    tmp_path = f"{output_path}.tmp"
+    api.append_to_csv([], tmp_path, header=True)
+    
+    # Filter articles by date (between 1/1/2015 and 1/1/2025)
+    start_date = datetime(2015, 1, 1)
+    end_date = datetime(2025, 1, 1)
+    
+    seen_articles = set()
+    total_unique = 0
+    total_in_range = 0
+    try:
+        for source in city_sources:
+            # Query for each source
+            query = f'({keyword_query}) AND source("{source}")'
+            encoded_query = urllib.parse.quote(query)
+            print(f"\nQuery for LexisNexis API ({city}, {source}):")
+            print(f"https://solutions.nexis.com/wsapi/news-and-directories/news/?Search={encoded_query}")
+            for batch_articles in api.iter_article_batches(query):
+                new_articles = []
+                for article in batch_articles:
+                    unique_id = (article.get('Title', ''), article.get('Date', ''))
+                    if unique_id not in seen_articles:
+                        seen_articles.add(unique_id)
+                        # Add city source to article
+                        article['City Source'] = source
+                        new_articles.append(article)
+                total_unique += len(new_articles)
+                filtered_articles = api.filter_articles_by_date(new_articles, start_date=start_date, end_date=end_date)
+                total_in_range += len(filtered_articles)
+                api.append_to_csv(filtered_articles, tmp_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    print(f"\nTotal unique articles found: {total_unique}")
+    print(f"Articles in date range: {total_in_range}")
     
     # Save results to CSV
-    output_path = os.path.join(output_dir, "lexisnexis.csv")
-    api.save_to_csv(filtered_articles, filename=output_path)
+    os.replace(tmp_path, output_path)
+    print(f"Results have been written to {output_path}")
     print(f"\nData saved to: {output_path}")
 
 def process_all_cities():
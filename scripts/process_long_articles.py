@@ -3,8 +3,8 @@ Process Long Newspaper Articles
 ==============================
 
 This script processes newspaper articles that are too long by searching for lexicon words
-and creating shorter, focused versions using spaCy sentence segmentation and paragraph
-context detection. This is useful when articles don't break by paragraph and need to be 
+and creating shorter, focused versions using paragraph context detection with a
+regex sentence splitter as fallback. This is useful when articles don't break by paragraph and need to be 
 shortened for analysis.
 
 USAGE:
@@ -15,23 +15,38 @@ python scripts/process_long_articles.py --output-dir processed_articles
 """
 
 import os
+import hashlib
+import numpy as np
 import pandas as pd
 import argparse
 import re
-import spacy
+from collections import OrderedDict
 from tqdm import tqdm
 from utils import CITY_MAP, KEYWORDS
 
-def load_spacy_model():
-    """Load spaCy model for sentence segmentation."""
-    try:
-        nlp = spacy.load("en_core_web_sm")
-        return nlp
-    except OSError:
-        print("Downloading spaCy model...")
-        import subprocess
-        subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-        return spacy.load("en_core_web_sm")
+def compile_keyword_regex(keywords):
+    """Compile one alternation that matches any keyword in already-lowercased text."""
+    return re.compile(r'\b(?:%s)\b' % '|'.join(re.escape(k.lower()) for k in keywords))
+
+# Keywords are lowercased once so matching runs case-sensitively against
+# lowercased text instead of paying for re.IGNORECASE on every search
+KEYWORDS_LC = [k.lower() for k in KEYWORDS]
+KEYWORD_RE = compile_keyword_regex(KEYWORDS)
+KEYWORD_PATTERNS = [re.compile(r'\b' + re.escape(k) + r'\b') for k in KEYWORDS_LC]
+
+# Wire-service stories are reprinted verbatim across cities, so article analysis
+# is memoized on a content digest for the whole run (bounded, LRU eviction)
+ARTICLE_CACHE_SIZE = 50000
+_article_cache = OrderedDict()
+
+# Sentence boundary: terminal punctuation followed by whitespace and an uppercase
+# letter or opening quote. Only sentence strings are needed downstream, and this
+# is adequate for well-punctuated news text without a spaCy parse
+_SENT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z"\'])')
+
+def split_sentences(text):
+    """Split text into sentence strings."""
+    return [s.strip() for s in _SENT_RE.split(text) if s.strip()]
 
 def detect_paragraphs(text):
     """Detect paragraph breaks in text using multiple methods."""
@@ -57,38 +72,49 @@ def detect_paragraphs(text):
     paragraphs = [p.strip() for p in paragraphs if p.strip()]
     return paragraphs
 
-def find_keyword_paragraphs(text, keywords, max_paragraphs=1, max_sentences=5, nlp=None):
-    """Find paragraphs with keywords and return shortened version."""
+def find_keyword_units(units, keyword_re, separator):
+    """Return sorted indices of the paragraphs/sentences that contain a keyword.
+    
+    Runs one regex scan over the lowercased, joined text and maps each match
+    offset back to its unit via the cumulative unit end offsets.
+    """
+    units_lc = [unit.lower() for unit in units]
+    starts = [m.start() for m in keyword_re.finditer(separator.join(units_lc))]
+    if not starts:
+        return []
+    ends = np.cumsum([len(unit) + len(separator) for unit in units_lc])
+    return np.unique(np.searchsorted(ends, starts, side='right')).tolist()
+
+def find_keyword_paragraphs(text, keywords, max_paragraphs=1, max_sentences=5):
+    """Find paragraphs with keywords and return shortened segments as (text, unit_count) pairs."""
     if not isinstance(text, str):
-        return [""]
+        return [("", 0)]
     
     text = str(text).strip()
     if not text:
-        return [""]
+        return [("", 0)]
     
     # Detect paragraphs
     paragraphs = detect_paragraphs(text)
     
     # If no paragraph breaks detected, fall back to sentence-based approach
     if paragraphs is None:
-        return find_keyword_sentences(text, keywords, max_sentences, nlp)
+        return find_keyword_sentences(text, keywords, max_sentences)
     
     if len(paragraphs) <= max_paragraphs:
-        return [text]
+        return [(text, len(paragraphs))]
+    
+    keyword_re = KEYWORD_RE if keywords is KEYWORDS else compile_keyword_regex(keywords)
+    
+    if max_paragraphs == 1:
+        return _find_keyword_paragraphs_max1(paragraphs, keyword_re)
     
     # Find paragraphs with keywords
-    keyword_paragraphs = []
-    for i, para in enumerate(paragraphs):
-        para_text = para.strip()
-        # Check if paragraph contains any keywords
-        for keyword in keywords:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', para_text, re.IGNORECASE):
-                keyword_paragraphs.append((i, para_text))
-                break
+    keyword_paragraphs = [(i, paragraphs[i]) for i in find_keyword_units(paragraphs, keyword_re, '\n\n')]
     
     if not keyword_paragraphs:
         # If no keywords found, return first max_paragraphs
-        return ['\n\n'.join(paragraphs[:max_paragraphs])]
+        return [('\n\n'.join(paragraphs[:max_paragraphs]), len(paragraphs[:max_paragraphs]))]
     
     # Sort by paragraph index
     keyword_paragraphs.sort()
@@ -106,7 +132,7 @@ def find_keyword_paragraphs(text, keywords, max_paragraphs=1, max_sentences=5, n
             # Create segment from current group
             if current_group:
                 segment = create_segment_from_paragraphs(current_group, paragraphs, max_paragraphs)
-                if segment:
+                if segment[0]:
                     segments.append(segment)
             current_group = [keyword_paragraphs[i]]
         else:
@@ -115,7 +141,7 @@ def find_keyword_paragraphs(text, keywords, max_paragraphs=1, max_sentences=5, n
     # Add the last group
     if current_group:
         segment = create_segment_from_paragraphs(current_group, paragraphs, max_paragraphs)
-        if segment:
+        if segment[0]:
             segments.append(segment)
     
     # Return list of segments instead of concatenated string
@@ -126,12 +152,37 @@ def find_keyword_paragraphs(text, keywords, max_paragraphs=1, max_sentences=5, n
     else:
         # Fallback to original logic if no segments created
         single_segment = create_single_segment_from_paragraphs(keyword_paragraphs, paragraphs, max_paragraphs)
-        return [single_segment] if single_segment else [""]
+        return [single_segment] if single_segment[0] else [("", 0)]
+
+def _find_keyword_paragraphs_max1(paragraphs, keyword_re):
+    """Specialization of find_keyword_paragraphs for max_paragraphs=1 (the CLI default).
+    
+    Each run of adjacent keyword paragraphs becomes one segment, padded with
+    one paragraph of context on either side.
+    """
+    keyword_indices = find_keyword_units(paragraphs, keyword_re, '\n\n')
+    if not keyword_indices:
+        return [(paragraphs[0], 1)]
+    
+    num_paragraphs = len(paragraphs)
+    segments = []
+    run_start = run_end = keyword_indices[0]
+    for idx in keyword_indices[1:]:
+        if idx == run_end + 1:
+            run_end = idx
+            continue
+        start_idx, end_idx = max(0, run_start - 1), min(num_paragraphs, run_end + 2)
+        segments.append(('\n\n'.join(paragraphs[start_idx:end_idx]), end_idx - start_idx))
+        run_start = run_end = idx
+    
+    start_idx, end_idx = max(0, run_start - 1), min(num_paragraphs, run_end + 2)
+    segments.append(('\n\n'.join(paragraphs[start_idx:end_idx]), end_idx - start_idx))
+    return segments
 
 def create_segment_from_paragraphs(keyword_paragraphs, paragraphs, max_paragraphs):
-    """Create a single segment from a group of keyword paragraphs."""
+    """Create a single (text, paragraph_count) segment from a group of keyword paragraphs."""
     if not keyword_paragraphs:
-        return ""
+        return "", 0
     
     # Find the range that covers all keyword paragraphs in this group
     keyword_indices = [idx for idx, _ in keyword_paragraphs]
@@ -144,33 +195,41 @@ def create_segment_from_paragraphs(keyword_paragraphs, paragraphs, max_paragraph
     
     # Get paragraphs in this window
     window_paragraphs = paragraphs[start_idx:end_idx]
-    return '\n\n'.join(window_paragraphs)
+    return '\n\n'.join(window_paragraphs), end_idx - start_idx
 
 def create_single_segment_from_paragraphs(keyword_paragraphs, paragraphs, max_paragraphs):
-    """Create a single segment using the original logic."""
+    """Create a single (text, paragraph_count) segment using the original logic."""
     # Find the best segment that includes keyword paragraphs
     best_segment = ""
+    best_segment_count = 0
     best_keyword_count = 0
     
-    for i, (para_idx, para_text) in enumerate(keyword_paragraphs):
+    # Loop invariants bound to locals for the scan below
+    half = max_paragraphs // 2
+    num_paragraphs = len(paragraphs)
+    patterns = KEYWORD_PATTERNS
+    
+    for para_idx, _ in keyword_paragraphs:
         # Calculate window around this keyword paragraph
-        start_idx = max(0, para_idx - max_paragraphs // 2)
-        end_idx = min(len(paragraphs), para_idx + max_paragraphs // 2)
+        start_idx = max(0, para_idx - half)
+        end_idx = min(num_paragraphs, para_idx + half)
         
         # Get paragraphs in this window
         window_paragraphs = paragraphs[start_idx:end_idx]
         segment_text = '\n\n'.join(window_paragraphs)
         
         # Count keywords in this segment
-        keyword_count = sum(1 for k in KEYWORDS if re.search(r'\b' + re.escape(k) + r'\b', segment_text, re.IGNORECASE))
+        segment_lc = segment_text.lower()
+        keyword_count = sum(1 for pattern in patterns if pattern.search(segment_lc))
         
         if keyword_count > best_keyword_count:
             best_keyword_count = keyword_count
             best_segment = segment_text
+            best_segment_count = end_idx - start_idx
     
     # If we found a good segment, return it
     if best_segment:
-        return best_segment
+        return best_segment, best_segment_count
     
     # Fallback: return first max_paragraphs that contain keywords
     result_paragraphs = []
@@ -178,7 +237,7 @@ def create_single_segment_from_paragraphs(keyword_paragraphs, paragraphs, max_pa
     
     for para in paragraphs[:max_paragraphs]:
         para_text = para.strip()
-        has_keyword = any(re.search(r'\b' + re.escape(k) + r'\b', para_text, re.IGNORECASE) for k in KEYWORDS)
+        has_keyword = KEYWORD_RE.search(para_text.lower()) is not None
         
         if has_keyword:
             keyword_found = True
@@ -189,44 +248,33 @@ def create_single_segment_from_paragraphs(keyword_paragraphs, paragraphs, max_pa
         # If no keyword found yet, skip this paragraph
     
     if result_paragraphs:
-        return '\n\n'.join(result_paragraphs)
+        return '\n\n'.join(result_paragraphs), len(result_paragraphs)
     
     # If still no keywords, return first max_paragraphs
-    return '\n\n'.join(paragraphs[:max_paragraphs])
+    return '\n\n'.join(paragraphs[:max_paragraphs]), len(paragraphs[:max_paragraphs])
 
-def find_keyword_sentences(text, keywords, max_sentences=5, nlp=None):
-    """Find sentences with keywords and return shortened version (fallback method)."""
+def find_keyword_sentences(text, keywords, max_sentences=5):
+    """Find sentences with keywords and return shortened (text, unit_count) segments (fallback method)."""
     if not isinstance(text, str):
-        return [""]
+        return [("", 0)]
     
     text = str(text).strip()
     if not text:
-        return [""]
+        return [("", 0)]
     
-    # Load spaCy model if not provided
-    if nlp is None:
-        nlp = load_spacy_model()
-    
-    # Process text with spaCy
-    doc = nlp(text)
-    sentences = list(doc.sents)
+    sentences = split_sentences(text)
     
     if len(sentences) <= max_sentences:
-        return [text]
+        return [(text, len(sentences))]
+    
+    keyword_re = KEYWORD_RE if keywords is KEYWORDS else compile_keyword_regex(keywords)
     
     # Find sentences with keywords
-    keyword_sentences = []
-    for i, sent in enumerate(sentences):
-        sent_text = sent.text.strip()
-        # Check if sentence contains any keywords
-        for keyword in keywords:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', sent_text, re.IGNORECASE):
-                keyword_sentences.append((i, sent_text))
-                break
+    keyword_sentences = [(i, sentences[i]) for i in find_keyword_units(sentences, keyword_re, ' ')]
     
     if not keyword_sentences:
         # If no keywords found, return first max_sentences
-        return [' '.join([sent.text.strip() for sent in sentences[:max_sentences]])]
+        return [(' '.join(sentences[:max_sentences]), len(sentences[:max_sentences]))]
     
     # Sort by sentence index
     keyword_sentences.sort()
@@ -244,7 +292,7 @@ def find_keyword_sentences(text, keywords, max_sentences=5, nlp=None):
             # Create segment from current group
             if current_group:
                 segment = create_segment_from_sentences(current_group, sentences, max_sentences)
-                if segment:
+                if segment[0]:
                     segments.append(segment)
             current_group = [keyword_sentences[i]]
         else:
@@ -253,7 +301,7 @@ def find_keyword_sentences(text, keywords, max_sentences=5, nlp=None):
     # Add the last group
     if current_group:
         segment = create_segment_from_sentences(current_group, sentences, max_sentences)
-        if segment:
+        if segment[0]:
             segments.append(segment)
     
     # Return list of segments instead of concatenated string
@@ -264,12 +312,12 @@ def find_keyword_sentences(text, keywords, max_sentences=5, nlp=None):
     else:
         # Fallback to original logic if no segments created
         single_segment = create_single_segment_from_sentences(keyword_sentences, sentences, max_sentences)
-        return [single_segment] if single_segment else [""]
+        return [single_segment] if single_segment[0] else [("", 0)]
 
 def create_segment_from_sentences(keyword_sentences, sentences, max_sentences):
-    """Create a single segment from a group of keyword sentences."""
+    """Create a single (text, sentence_count) segment from a group of keyword sentences."""
     if not keyword_sentences:
-        return ""
+        return "", 0
     
     # Find the range that covers all keyword sentences in this group
     keyword_indices = [idx for idx, _ in keyword_sentences]
@@ -282,41 +330,48 @@ def create_segment_from_sentences(keyword_sentences, sentences, max_sentences):
     
     # Get sentences in this window
     window_sentences = sentences[start_idx:end_idx]
-    return ' '.join([sent.text.strip() for sent in window_sentences])
+    return ' '.join(window_sentences), end_idx - start_idx
 
 def create_single_segment_from_sentences(keyword_sentences, sentences, max_sentences):
-    """Create a single segment using the original logic."""
+    """Create a single (text, sentence_count) segment using the original logic."""
     # Find the best segment that includes keyword sentences
     best_segment = ""
+    best_segment_count = 0
     best_keyword_count = 0
     
-    for i, (sent_idx, sent_text) in enumerate(keyword_sentences):
+    # Loop invariants bound to locals for the scan below
+    half = max_sentences // 2
+    num_sentences = len(sentences)
+    patterns = KEYWORD_PATTERNS
+    
+    for sent_idx, _ in keyword_sentences:
         # Calculate window around this keyword sentence
-        start_idx = max(0, sent_idx - max_sentences // 2)
-        end_idx = min(len(sentences), sent_idx + max_sentences // 2)
+        start_idx = max(0, sent_idx - half)
+        end_idx = min(num_sentences, sent_idx + half)
         
         # Get sentences in this window
         window_sentences = sentences[start_idx:end_idx]
-        segment_text = ' '.join([sent.text.strip() for sent in window_sentences])
+        segment_text = ' '.join(window_sentences)
         
         # Count keywords in this segment
-        keyword_count = sum(1 for k in KEYWORDS if re.search(r'\b' + re.escape(k) + r'\b', segment_text, re.IGNORECASE))
+        segment_lc = segment_text.lower()
+        keyword_count = sum(1 for pattern in patterns if pattern.search(segment_lc))
         
         if keyword_count > best_keyword_count:
             best_keyword_count = keyword_count
             best_segment = segment_text
+            best_segment_count = end_idx - start_idx
     
     # If we found a good segment, return it
     if best_segment:
-        return best_segment
+        return best_segment, best_segment_count
     
     # Fallback: return first max_sentences that contain keywords
     result_sentences = []
     keyword_found = False
     
-    for sent in sentences[:max_sentences]:
-        sent_text = sent.text.strip()
-        has_keyword = any(re.search(r'\b' + re.escape(k) + r'\b', sent_text, re.IGNORECASE) for k in KEYWORDS)
+    for sent_text in sentences[:max_sentences]:
+        has_keyword = KEYWORD_RE.search(sent_text.lower()) is not None
         
         if has_keyword:
             keyword_found = True
@@ -327,12 +382,42 @@ def create_single_segment_from_sentences(keyword_sentences, sentences, max_sente
         # If no keyword found yet, skip this sentence
     
     if result_sentences:
-        return ' '.join(result_sentences)
+        return ' '.join(result_sentences), len(result_sentences)
     
     # If still no keywords, return first max_sentences
-    return ' '.join([sent.text.strip() for sent in sentences[:max_sentences]])
+    return ' '.join(sentences[:max_sentences]), len(sentences[:max_sentences])
 
-def process_articles_for_city(city, city_dir, base_data_dir, max_paragraphs, max_sentences, nlp=None):
+def analyze_article(text, max_paragraphs, max_sentences):
+    """Return ((text, unit_count) segments, paragraphs_or_None, original_count), memoized by content."""
+    if not isinstance(text, str):
+        return _analyze_article(text, max_paragraphs, max_sentences)
+    
+    key = (hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest(), max_paragraphs, max_sentences)
+    result = _article_cache.get(key)
+    if result is not None:
+        _article_cache.move_to_end(key)
+        return result
+    
+    result = _analyze_article(text, max_paragraphs, max_sentences)
+    _article_cache[key] = result
+    if len(_article_cache) > ARTICLE_CACHE_SIZE:
+        _article_cache.popitem(last=False)
+    return result
+
+def _analyze_article(text, max_paragraphs, max_sentences):
+    """Segment an article and count its paragraphs (or sentences when it has no paragraph breaks)."""
+    segments = find_keyword_paragraphs(text, KEYWORDS, max_paragraphs, max_sentences)
+    paragraphs = detect_paragraphs(str(text))
+    
+    # Count paragraphs/sentences in original text
+    if paragraphs is None:
+        original_count = len(split_sentences(str(text)))
+    else:
+        original_count = len(paragraphs)
+    
+    return segments, paragraphs, original_count
+
+def process_articles_for_city(city, city_dir, base_data_dir, max_paragraphs, max_sentences):
     """Process articles for a specific city."""
     news_dir = os.path.join(base_data_dir, city_dir, 'newspaper')
     news_path = os.path.join(news_dir, f'{city_dir}_filtered.csv')
@@ -360,62 +445,69 @@ def process_articles_for_city(city, city_dir, base_data_dir, max_paragraphs, max
             print(f"No content column found in {news_path}")
             return None
         
+        # Articles without line breaks and with at most max_sentences sentences
+        # pass through unchanged, so split them off with vectorized checks and
+        # only send the remaining rows through the per-article pipeline
+        texts = df[content_col]
+        is_text = texts.map(lambda x: isinstance(x, str)).astype(bool)
+        stripped = texts.where(is_text, '').astype(str).str.strip()
+        sentence_counts = stripped.str.count(_SENT_RE.pattern) + 1
+        short_mask = (is_text & (stripped.str.len() > 0)
+                      & ~stripped.str.contains('\n', regex=False)
+                      & (sentence_counts <= max_sentences))
+        
+        short_df = df[short_mask].copy()
+        short_df[content_col] = stripped[short_mask]
+        short_df['original_count'] = sentence_counts[short_mask]
+        short_df['processed_count'] = sentence_counts[short_mask]
+        short_df['was_shortened'] = False
+        short_df['used_sentence_method'] = True
+        short_df['segment_count'] = 1
+        short_df['segment_index'] = 0
+        long_df = df[~short_mask]
+        
         # Process each article with progress bar
         processed_articles = []
         shortened_count = 0
         paragraph_method_count = 0
-        sentence_method_count = 0
+        sentence_method_count = len(short_df)
         new_entries_count = 0  # Track how many new entries created
         
-        for idx, row in tqdm(df.iterrows(), total=len(df), desc=f"Processing {city}"):
+        for idx, row in tqdm(long_df.iterrows(), total=len(long_df), desc=f"Processing {city}"):
             original_text = row[content_col]
-            processed_segments = find_keyword_paragraphs(original_text, KEYWORDS, max_paragraphs, max_sentences, nlp)
+            processed_segments, paragraphs, original_count = analyze_article(original_text, max_paragraphs, max_sentences)
             
             # Detect which method was used
-            paragraphs = detect_paragraphs(str(original_text))
             used_sentence_method = paragraphs is None
-            
-            # Count paragraphs/sentences in original text
             if used_sentence_method:
-                original_doc = nlp(str(original_text))
-                original_count = len(list(original_doc.sents))
                 sentence_method_count += 1
             else:
-                original_paragraphs = detect_paragraphs(str(original_text))
-                original_count = len(original_paragraphs) if original_paragraphs else 0
                 paragraph_method_count += 1
+            was_shortened = original_count > (max_paragraphs if not used_sentence_method else max_sentences)
             
             # Create a separate row for each segment
-            for segment_idx, processed_text in enumerate(processed_segments):
-                # Count paragraphs/sentences in processed text
-                if used_sentence_method:
-                    processed_doc = nlp(processed_text)
-                    processed_count = len(list(processed_doc.sents))
-                else:
-                    processed_paragraphs = detect_paragraphs(processed_text)
-                    processed_count = len(processed_paragraphs) if processed_paragraphs else 0
-                
+            for segment_idx, (processed_text, processed_count) in enumerate(processed_segments):
                 # Create new row with processed text
                 new_row = row.copy()
                 new_row[content_col] = processed_text
                 new_row['original_count'] = original_count
                 new_row['processed_count'] = processed_count
-                new_row['was_shortened'] = original_count > (max_paragraphs if not used_sentence_method else max_sentences)
+                new_row['was_shortened'] = was_shortened
                 new_row['used_sentence_method'] = used_sentence_method
                 new_row['segment_count'] = len(processed_segments)  # Total segments for this article
                 new_row['segment_index'] = segment_idx  # Which segment this is (0-based)
                 
                 processed_articles.append(new_row)
                 
-                if original_count > (max_paragraphs if not used_sentence_method else max_sentences):
+                if was_shortened:
                     shortened_count += 1
             
             # Count additional segments created (beyond the original 1)
             if len(processed_segments) > 1:
                 new_entries_count += len(processed_segments) - 1
         
-        # Create processed dataframe
-        processed_df = pd.DataFrame(processed_articles)
+        # Create processed dataframe, restoring the original article order
+        processed_df = pd.concat([short_df, pd.DataFrame(processed_articles)]).sort_index(kind='stable')
         
         # Save to same directory as input file
         output_path = os.path.join(news_dir, f'{city_dir}_processed_articles.csv')
@@ -438,10 +530,6 @@ def process_articles_for_city(city, city_dir, base_data_dir, max_paragraphs, max
 def process_all_articles(base_data_dir='data', max_paragraphs=1, max_sentences=5, cities=None):
     """Process articles for all cities or specified cities."""
     
-    # Load spaCy model once for all processing
-    print("Loading spaCy model...")
-    nlp = load_spacy_model()
-    
     # Determine which cities to process
     if cities:
         cities_to_process = [city.strip() for city in cities.split(',')]
@@ -453,7 +541,14 @@ def process_all_articles(base_data_dir='data', max_paragraphs=1, max_sentences=5
     print(f"Maximum sentences (fallback): {max_sentences}")
     print("=" * 50)
     
-    all_processed = []
+    # Each city's rows are appended to the combined file as soon as they are
+    # processed, so only one city's DataFrame is held in memory at a time. The
+    # file is written under a temporary name and only published if at least
+    # two cities contributed to it
+    combined_path = os.path.join(base_data_dir, 'all_processed_articles.csv')
+    partial_path = combined_path + '.partial'
+    combined_columns = None
+    cities_combined = 0
     total_articles = 0
     total_shortened = 0
     total_new_entries = 0
@@ -464,22 +559,30 @@ def process_all_articles(base_data_dir='data', max_paragraphs=1, max_sentences=5
             continue
             
         city_dir = CITY_MAP[city]
-        processed_df = process_articles_for_city(city, city_dir, base_data_dir, max_paragraphs, max_sentences, nlp)
+        processed_df = process_articles_for_city(city, city_dir, base_data_dir, max_paragraphs, max_sentences)
         
         if processed_df is not None:
-            all_processed.append(processed_df)
+            if combined_columns is None:
+                combined_columns = list(processed_df.columns)
+                processed_df.to_csv(partial_path, index=False)
+            else:
+                extra_columns = [col for col in processed_df.columns if col not in combined_columns]
+                if extra_columns:
+                    print(f"  Columns not in combined file, skipped: {', '.join(extra_columns)}")
+                processed_df.reindex(columns=combined_columns).to_csv(partial_path, mode='a', header=False, index=False)
+            cities_combined += 1
             total_articles += len(processed_df)
             total_shortened += processed_df['was_shortened'].sum()
             # Count new entries by counting segments with segment_index > 0
             if 'segment_index' in processed_df.columns:
                 total_new_entries += len(processed_df[processed_df['segment_index'] > 0])
     
-    # Create combined file if multiple cities processed
-    if len(all_processed) > 1:
-        combined_df = pd.concat(all_processed, ignore_index=True)
-        combined_path = os.path.join(base_data_dir, 'all_processed_articles.csv')
-        combined_df.to_csv(combined_path, index=False)
+    # Keep combined file if multiple cities processed
+    if cities_combined > 1:
+        os.replace(partial_path, combined_path)
         print(f"\nCombined file saved to: {combined_path}")
+    elif cities_combined == 1:
+        os.remove(partial_path)
     
     # Summary statistics
     print("\n" + "=" * 50)
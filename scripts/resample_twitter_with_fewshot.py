@@ -17,10 +17,16 @@ The script will:
 """
 
 import os
+import re
+import sys
+import numpy as np
 import pandas as pd
 import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from tqdm import tqdm
-from utils import CITY_MAP
+from utils import CITY_MAP, READ_ERRORS
 
 # The 5 few-shot examples to preserve
 FEW_SHOT_EXAMPLES = [
@@ -35,30 +41,73 @@ FEW_SHOT_EXAMPLES = [
     "[ORGANIZATION] area in [ORGANIZATION] is facing a housing crisis. 40% of people in this area live in poverty, and the city lacks 20,000 affordable housing units. Initiatives like [ORGANIZATION] to fix old housing, but progress depends on securing funding. [URL]"
 ]
 
+# Rows per chunk when reading a city's posts CSV
+READ_CHUNK_SIZE = 100000
+
+# Placeholders that don't contribute to meaningful similarity
+_PLACEHOLDER_RE = re.compile(r'\[(?:organization|user|url|person|location|time|date|address|street)\]')
+
 def find_few_shot_examples(df, few_shot_texts, similarity_threshold=0.9):
-    """Find the first unique few-shot example in the dataframe using 90% similarity matching."""
+    """Find the row positions of the few-shot examples in the dataframe using 90% similarity matching."""
     found_indices = []
+    found_indices_set = set()  # for constant-time "already used" checks
     found_texts = []
     
+    # Give each word that appears in any target a bit, so every target is an
+    # integer bitmask; a post's overlap with a target is then the popcount of
+    # an AND, and words outside the targets only count toward the post's size
+    target_token_sets = [_tokenize(target_text) for target_text in few_shot_texts]
+    vocab = {}
+    target_masks = []
+    for target_tokens in target_token_sets:
+        target_mask = 0
+        for token in target_tokens:
+            target_mask |= 1 << vocab.setdefault(token, len(vocab))
+        target_masks.append(target_mask)
+    target_sizes = [len(target_tokens) for target_tokens in target_token_sets]
+    
+    # Score every post against all targets in a single pass over the data,
+    # keeping only the candidates that meet the threshold for each target.
+    # Posts sharing no word with a target have similarity 0 and never match.
+    candidates = [[] for _ in few_shot_texts]
+    for idx, tokens in enumerate(df['_tokens'].tolist()):
+        mask = 0
+        for token in tokens:
+            bit = vocab.get(token)
+            if bit is not None:
+                mask |= 1 << bit
+        if not mask:
+            continue
+        
+        size = len(tokens)
+        low, high = _size_bounds(size, similarity_threshold)
+        for i, target_mask in enumerate(target_masks):
+            if not low <= target_sizes[i] <= high:
+                continue
+            common = (mask & target_mask).bit_count()
+            if not common:
+                continue
+            similarity = common / (size + target_sizes[i] - common)
+            if similarity >= similarity_threshold:
+                candidates[i].append((idx, similarity))
+    
+    # Resolve targets in order so an earlier target keeps its match
     for i, target_text in enumerate(few_shot_texts):
         best_match_idx = None
         best_similarity = 0
         
-        # Calculate similarity with each row in the dataframe
-        for idx, row in df.iterrows():
+        for idx, similarity in candidates[i]:
             # Skip if this index is already used
-            if idx in found_indices:
+            if idx in found_indices_set:
                 continue
-                
-            actual_text = row['Deidentified_text']
-            similarity = calculate_similarity(target_text, actual_text)
             
-            if similarity > best_similarity and similarity >= similarity_threshold:
+            if similarity > best_similarity:
                 best_similarity = similarity
                 best_match_idx = idx
         
         if best_match_idx is not None:
             found_indices.append(best_match_idx)
+            found_indices_set.add(best_match_idx)
             found_texts.append(target_text)
             print(f"Found few-shot example {i+1} (similarity: {best_similarity:.2f}): {target_text[:100]}...")
         else:
@@ -73,12 +122,12 @@ def remove_twitter_duplicates(df, similarity_threshold=0.4):
     
     # For tweets that are not retweets, we want to remove similar duplicates
     # For retweets, we'll keep them as they represent different instances
-    # Handle both string and boolean values for is_retweet
-    non_retweet_mask = df['is_retweet'].isin([False, 'False'])
+    # (is_retweet is normalized to booleans when the posts are loaded)
+    non_retweet_mask = ~df['is_retweet']
     
     # Find duplicates among non-retweets
-    non_retweet_df = df[non_retweet_mask].copy()
-    retweet_df = df[~non_retweet_mask].copy()
+    non_retweet_df = df[non_retweet_mask]
+    retweet_df = df[~non_retweet_mask]
     
     if non_retweet_df.empty:
         return df
@@ -88,76 +137,172 @@ def remove_twitter_duplicates(df, similarity_threshold=0.4):
     non_retweet_df = non_retweet_df.drop_duplicates(subset=['Deidentified_text'], keep='first')
     print(f"After exact deduplication: {len(non_retweet_df)} non-retweets")
     
-    # Remove fuzzy duplicates from non-retweets
-    to_keep = []
-    to_remove = set()
+    # Remove fuzzy duplicates from non-retweets with a prefix-filtered
+    # inverted index. Words are ordered rarest first; if two sets reach the
+    # threshold they must share a word within each other's prefix (the first
+    # |set| - ceil(threshold * |set|) + 1 words), so kept tweets are indexed
+    # by their prefix words only and a new tweet probes with its own prefix.
+    # Every candidate found that way is verified with the exact similarity.
+    #
+    # Each tweet records the kept tweet it duplicates in `representative`
+    # (a one-level union-find whose roots are the kept tweets). Tweets are
+    # only ever merged into an earlier kept tweet, never into each other,
+    # which keeps the first-come greedy result; merging whole connected
+    # components would let chains of near-duplicates swallow dissimilar tweets.
+    token_sets = non_retweet_df['_tokens'].tolist()
+    sizes = [len(tokens) for tokens in token_sets]
+    doc_freq = Counter(token for tokens in token_sets for token in tokens)
+    representative = np.arange(len(token_sets))
+    # prefix word -> set size -> positions of kept tweets; blocking the
+    # postings by size lets a probe skip whole blocks the size filter rules out
+    postings = defaultdict(lambda: defaultdict(list))
+    # Word sets already kept; a tweet with the same words has similarity 1
+    # and is resolved by a hash lookup without probing the index
+    kept_sets = {}
     
     print("Removing fuzzy duplicates...")
-    for i, row1 in tqdm(non_retweet_df.iterrows(), total=len(non_retweet_df), desc="Deduplicating tweets"):
-        if i in to_remove:
+    for pos, tokens in enumerate(tqdm(token_sets, desc="Deduplicating tweets")):
+        if tokens in kept_sets and similarity_threshold <= 1:
+            representative[pos] = kept_sets[tokens]
             continue
-            
-        # Check if this tweet is similar to any we've already decided to keep
-        should_keep = True
-        for keep_idx in to_keep:
-            row2 = non_retweet_df.loc[keep_idx]
-            similarity = calculate_similarity(row1['Deidentified_text'], row2['Deidentified_text'])
-            if similarity >= similarity_threshold:
-                should_keep = False
+        
+        size = sizes[pos]
+        prefix = sorted(tokens, key=lambda token: (doc_freq[token], token))[:_prefix_length(size, similarity_threshold)]
+        
+        # Check if this tweet is similar to any we've already decided to keep,
+        # skipping kept tweets whose size is out of reach of the threshold
+        low, high = _size_bounds(size, similarity_threshold)
+        checked = set()
+        duplicate_of = None
+        for token in prefix:
+            for kept_size, block in postings.get(token, {}).items():
+                if not low <= kept_size <= high:
+                    continue
+                for kept_pos in block:
+                    if kept_pos in checked:
+                        continue
+                    checked.add(kept_pos)
+                    common = len(tokens & token_sets[kept_pos])
+                    if common / (size + kept_size - common) >= similarity_threshold:
+                        duplicate_of = kept_pos
+                        break
+                if duplicate_of is not None:
+                    break
+            if duplicate_of is not None:
                 break
         
-        if should_keep:
-            to_keep.append(i)
+        if duplicate_of is not None:
+            representative[pos] = duplicate_of
         else:
-            to_remove.add(i)
+            for token in prefix:
+                postings[token][size].append(pos)
+            if tokens:
+                kept_sets[tokens] = pos
     
     # Keep only the first occurrence of each similar group
-    non_retweet_deduplicated = non_retweet_df.loc[to_keep].copy()
+    keep_mask = representative == np.arange(len(token_sets))
+    non_retweet_deduplicated = non_retweet_df.iloc[keep_mask]
     
-    # Combine retweets and deduplicated non-retweets
-    deduplicated_df = pd.concat([retweet_df, non_retweet_deduplicated], ignore_index=True)
+    # Combine retweets and deduplicated non-retweets (callers usually pass
+    # non-retweets only, in which case there is nothing to concatenate)
+    if retweet_df.empty:
+        deduplicated_df = non_retweet_deduplicated
+    else:
+        deduplicated_df = pd.concat([retweet_df, non_retweet_deduplicated], ignore_index=True)
     
-    # Sort by created_at to maintain chronological order
-    deduplicated_df = deduplicated_df.sort_values('created_at')
+    # Sort by the parsed created_at to maintain chronological order; the
+    # result gets a fresh 0..N-1 index so labels and positions coincide
+    deduplicated_df = deduplicated_df.sort_values('_created_at', kind='stable', ignore_index=True)
     
     return deduplicated_df
 
-def calculate_similarity(text1, text2):
-    """Calculate similarity between two texts using word-based comparison."""
-    if pd.isna(text1) or pd.isna(text2):
-        return 0
-    
-    text1 = str(text1).strip()
-    text2 = str(text2).strip()
-    
-    if not text1 or not text2:
-        return 0
-    
-    # Convert to lowercase and split into words
-    text1_lower = text1.lower()
-    text2_lower = text2.lower()
-    
-    # Remove common placeholders that don't contribute to meaningful similarity
-    placeholders = ['[organization]', '[user]', '[url]', '[person]', '[location]', '[time]', '[date]', '[address]', '[street]']
-    for placeholder in placeholders:
-        text1_lower = text1_lower.replace(placeholder, '')
-        text2_lower = text2_lower.replace(placeholder, '')
-    
-    # Split into words and remove empty strings
-    words1 = [w for w in text1_lower.split() if w]
-    words2 = [w for w in text2_lower.split() if w]
-    
+def _tokenize(text):
+    """Lowercase a text, strip placeholders and return its set of words."""
+    if pd.isna(text):
+        return frozenset()
+    return frozenset(map(sys.intern, _PLACEHOLDER_RE.sub('', str(text).lower()).split()))
+
+def _tokenize_batch(series):
+    """Tokenize a whole text column at once, giving a Series of word sets."""
+    cleaned = series.fillna('').astype(str).str.lower().str.replace(_PLACEHOLDER_RE, '', regex=True)
+    # Intern the words so each distinct word is stored once and set lookups
+    # between posts compare identical objects
+    return cleaned.str.split().map(lambda words: frozenset(map(sys.intern, words)))
+
+@lru_cache(maxsize=None)
+def _size_bounds(size, threshold):
+    """Return the range of set sizes that can reach the threshold against a set of this size."""
+    # Jaccard similarity can never exceed min(|a|, |b|) / max(|a|, |b|), so
+    # sizes outside this range are rejected without touching the sets. The
+    # bounds are checked with the same division so float rounding agrees.
+    if threshold <= 0 or size == 0:
+        return 0, float('inf')
+    if threshold > 1:
+        return 1, 0
+    low = max(int(size * threshold) - 1, 0)
+    while low / size < threshold:
+        low += 1
+    high = int(size / threshold) + 1
+    while size / high < threshold:
+        high -= 1
+    return low, high
+
+def _prefix_length(size, threshold):
+    """Return how many of a set's rarest words must be indexed for the prefix filter."""
+    # Two sets reaching the threshold share at least ceil(threshold * size)
+    # words, so at least one of them lies in the first size - that + 1 words.
+    # int() rounds down, which can only make the prefix longer and is safe
+    # against float rounding in threshold * size.
+    return min(size, size - int(threshold * size) + 1)
+
+def calculate_similarity(words1, words2, threshold=0):
+    """Calculate word-level Jaccard similarity between two tokenized texts."""
     if not words1 or not words2:
         return 0
     
-    # Calculate word-level similarity
-    common_words = set(words1) & set(words2)
-    total_unique_words = len(set(words1) | set(words2))
-    
-    if total_unique_words == 0:
+    # Sets whose sizes are too far apart cannot reach the threshold
+    low, high = _size_bounds(len(words1), threshold)
+    if not low <= len(words2) <= high:
         return 0
     
-    return len(common_words) / total_unique_words
+    # The union size follows from the set sizes
+    common = len(words1 & words2)
+    return common / (len(words1) + len(words2) - common)
+
+def _load_city(city, city_dir, base_data_dir):
+    """Load one city's posts and return its non-retweets along with a status message."""
+    x_dir = os.path.join(base_data_dir, city_dir, 'x')
+    posts_path = os.path.join(x_dir, 'posts_english_2015-2025_rt_deidentified.csv')
+    
+    if not os.path.isfile(posts_path):
+        return None, f"File not found: {posts_path}"
+        
+    try:
+        # Read in chunks and drop retweets as each chunk arrives, so retweet
+        # rows are never held in memory all at once. Every column is kept
+        # because the sampled rows are written out in full.
+        chunks = []
+        for chunk in pd.read_csv(posts_path, chunksize=READ_CHUNK_SIZE):
+            if 'is_retweet' not in chunk.columns or 'Deidentified_text' not in chunk.columns:
+                return None, f"Required columns not found in {posts_path}. Skipping."
+            
+            # Normalize is_retweet to a boolean column once; it may have been
+            # parsed as bools or as strings
+            chunk['is_retweet'] = chunk['is_retweet'].astype(str).eq('True')
+            
+            # Filter for non-retweets
+            chunks.append(chunk[~chunk['is_retweet']])
+        
+        non_rt = pd.concat(chunks)
+        
+        if non_rt.empty:
+            return None, None
+        
+        non_rt = non_rt.assign(city=city)
+        return non_rt, f"  {city}: {len(non_rt)} non-retweet posts"
+        
+    except READ_ERRORS as e:
+        return None, f"Error processing {posts_path}: {e}"
 
 def resample_twitter_with_fewshot(base_data_dir='data', samples_per_city=50, 
                                 output_file='gold_standard/resampled_twitter_with_fewshot.csv',
@@ -170,40 +315,20 @@ def resample_twitter_with_fewshot(base_data_dir='data', samples_per_city=50,
         os.makedirs(output_dir)
         print(f"Created directory: {output_dir}")
     
-    # First, collect all non-retweet data from all cities
+    # First, collect all non-retweet data from all cities. The CSVs are read
+    # on a thread pool; messages are printed here in city order.
     all_non_rt_data = []
     city_data_mapping = {}  # Track which data belongs to which city
     
     print("Collecting all non-retweet data...")
-    for city, city_dir in tqdm(CITY_MAP.items(), desc="Processing cities"):
-        x_dir = os.path.join(base_data_dir, city_dir, 'x')
-        posts_path = os.path.join(x_dir, 'posts_english_2015-2025_rt_deidentified.csv')
-        
-        if not os.path.isfile(posts_path):
-            print(f"File not found: {posts_path}")
-            continue
-            
-        try:
-            df = pd.read_csv(posts_path)
-            
-            if 'is_retweet' not in df.columns or 'Deidentified_text' not in df.columns:
-                print(f"Required columns not found in {posts_path}. Skipping.")
-                continue
-            
-            # Convert is_retweet to string to handle boolean values properly
-            df['is_retweet'] = df['is_retweet'].astype(str)
-            
-            # Filter for non-retweets
-            non_rt = df[df['is_retweet'] != 'True']
-            
-            if not non_rt.empty:
-                non_rt['city'] = city
+    with ThreadPoolExecutor(max_workers=min(8, len(CITY_MAP))) as executor:
+        results = executor.map(lambda item: _load_city(item[0], item[1], base_data_dir), CITY_MAP.items())
+        for city, (non_rt, message) in tqdm(zip(CITY_MAP, results), total=len(CITY_MAP), desc="Processing cities"):
+            if message:
+                print(message)
+            if non_rt is not None:
                 all_non_rt_data.append(non_rt)
                 city_data_mapping[city] = non_rt
-                print(f"  {city}: {len(non_rt)} non-retweet posts")
-            
-        except Exception as e:
-            print(f"Error processing {posts_path}: {e}")
     
     if not all_non_rt_data:
         print("No non-retweet data found.")
@@ -211,6 +336,12 @@ def resample_twitter_with_fewshot(base_data_dir='data', samples_per_city=50,
     
     # Combine all data
     all_data = pd.concat(all_non_rt_data, ignore_index=True)
+    
+    # Tokenize every post once; dedup and few-shot matching compare these sets
+    all_data['_tokens'] = _tokenize_batch(all_data['Deidentified_text'])
+    # Parse timestamps once so sorting compares datetimes rather than strings;
+    # the original created_at column is what gets written out
+    all_data['_created_at'] = pd.to_datetime(all_data['created_at'], utc=True, errors='coerce', format='ISO8601')
     print(f"\nTotal non-retweet posts across all cities: {len(all_data)}")
     
     # Apply fuzzy deduplication FIRST to the entire dataset
@@ -240,38 +371,55 @@ def resample_twitter_with_fewshot(base_data_dir='data', samples_per_city=50,
     else:
         print(f"✗ No few-shot examples found")
     
-    # Remove few-shot examples from all data
-    remaining_data = all_data.drop(few_shot_indices)
+    # Remove few-shot examples from all data with a positional mask
+    few_shot_indices = np.asarray(few_shot_indices, dtype=np.int64)
+    remaining_mask = np.ones(len(all_data), dtype=bool)
+    remaining_mask[few_shot_indices] = False
+    remaining_data = all_data.iloc[remaining_mask]
     print(f"Remaining posts after removing few-shot examples: {len(remaining_data)}")
     
     # Sample per city from remaining data, accounting for few-shot examples
-    all_samples = []
     few_shot_by_city = {}
     
     # Count few-shot examples per city
-    if few_shot_indices:
-        few_shot_data = all_data.loc[few_shot_indices].copy()
+    if len(few_shot_indices):
+        few_shot_data = all_data.iloc[few_shot_indices]
         few_shot_by_city = few_shot_data['city'].value_counts().to_dict()
         print(f"\nFew-shot examples by city:")
         for city, count in few_shot_by_city.items():
             print(f"  {city}: {count} few-shot examples")
     
+    # Split the remaining data by city in one pass (groups keep row order)
+    city_groups = dict(tuple(remaining_data.groupby('city', sort=False)))
+    no_city_data = remaining_data.iloc[0:0]
+    
+    # Each city's sample is appended to the output as soon as it is drawn and
+    # the few-shot examples go last, so the final sample is never assembled
+    # in memory. Rows are written to a .partial file that is only moved into
+    # place once everything has been written.
+    partial_path = output_file + '.partial'
+    output_columns = [col for col in all_data.columns if col not in ('_tokens', '_created_at')]
+    rows_written = 0
+    sampled_count = 0
+    sampled_cities = 0
+    city_counts = Counter()
+    
     print("\nSampling per city...")
     for city, city_dir in tqdm(CITY_MAP.items(), desc="Sampling cities"):
         if city not in city_data_mapping:
             continue
             
         # Get data for this city (excluding few-shot examples)
-        city_data = remaining_data[remaining_data['city'] == city]
+        city_data = city_groups.get(city, no_city_data)
         
         # Calculate how many additional samples we can take
         few_shot_count = few_shot_by_city.get(city, 0)
         available_slots = samples_per_city - few_shot_count
         
+        sample = None
         if len(city_data) > 0 and available_slots > 0:
             sample_size = min(available_slots, len(city_data))
             sample = city_data.sample(n=sample_size, random_state=42)
-            all_samples.append(sample)
             print(f"  {city}: {len(sample)} sampled posts + {few_shot_count} few-shot = {len(sample) + few_shot_count} total")
         elif few_shot_count > 0:
             print(f"  {city}: 0 sampled posts + {few_shot_count} few-shot = {few_shot_count} total")
@@ -279,57 +427,61 @@ def resample_twitter_with_fewshot(base_data_dir='data', samples_per_city=50,
             # If we have data but no few-shot examples, sample up to the limit
             sample_size = min(samples_per_city, len(city_data))
             sample = city_data.sample(n=sample_size, random_state=42)
-            all_samples.append(sample)
             print(f"  {city}: {len(sample)} sampled posts (no few-shot examples)")
         else:
             print(f"  {city}: No data available for sampling")
-    
-    # Combine all samples
-    if all_samples:
-        combined_samples = pd.concat(all_samples, ignore_index=True)
-        print(f"\nTotal sampled posts: {len(combined_samples)}")
+        
+        if sample is not None:
+            sample.to_csv(partial_path, mode='a' if rows_written else 'w', header=not rows_written,
+                          index=False, columns=output_columns)
+            rows_written += len(sample)
+            sampled_count += len(sample)
+            sampled_cities += 1
+            city_counts.update(sample['city'])
+    
+    # Report samples, then append the few-shot examples
+    if sampled_cities:
+        print(f"\nTotal sampled posts: {sampled_count}")
     else:
-        combined_samples = pd.DataFrame()
         print("No samples collected.")
     
-    # Get few-shot examples
-    if few_shot_indices:
-        few_shot_data = all_data.loc[few_shot_indices].copy()
+    if len(few_shot_indices):
         print(f"Few-shot examples: {len(few_shot_data)}")
-        
-        # Combine samples and few-shot examples
-        final_combined = pd.concat([combined_samples, few_shot_data], ignore_index=True)
+        few_shot_data.to_csv(partial_path, mode='a' if rows_written else 'w', header=not rows_written,
+                             index=False, columns=output_columns)
+        rows_written += len(few_shot_data)
+        city_counts.update(few_shot_data['city'])
     else:
-        final_combined = combined_samples
         print("No few-shot examples found.")
     
     # Save to file
-    if not final_combined.empty:
-        final_combined.to_csv(output_file, index=False)
+    if rows_written:
+        os.replace(partial_path, output_file)
         print(f"\nResampled Twitter data saved to {output_file}")
-        print(f"Total posts: {len(final_combined)}")
-        print(f"Sampled posts: {len(combined_samples)}")
-        print(f"Few-shot examples: {len(few_shot_data) if few_shot_indices else 0}")
+        print(f"Total posts: {rows_written}")
+        print(f"Sampled posts: {sampled_count}")
+        print(f"Few-shot examples: {len(few_shot_data) if len(few_shot_indices) else 0}")
         
         # Show distribution
-        if 'city' in final_combined.columns:
-            print("\nCity distribution:")
-            city_counts = final_combined['city'].value_counts()
-            print(city_counts)
-            
-            # Verify max per city
-            max_per_city = city_counts.max()
-            if max_per_city > samples_per_city:
-                print(f"⚠ Warning: {city_counts.idxmax()} has {max_per_city} posts (exceeds limit of {samples_per_city})")
-            else:
-                print(f"✓ All cities have ≤ {samples_per_city} posts")
+        print("\nCity distribution:")
+        for city, count in city_counts.most_common():
+            print(f"  {city}: {count}")
+        
+        # Verify max per city
+        max_city, max_per_city = city_counts.most_common(1)[0]
+        if max_per_city > samples_per_city:
+            print(f"⚠ Warning: {max_city} has {max_per_city} posts (exceeds limit of {samples_per_city})")
+        else:
+            print(f"✓ All cities have ≤ {samples_per_city} posts")
         
         # Show few-shot summary
-        if few_shot_indices:
+        if len(few_shot_indices):
             print(f"\nFew-shot summary:")
             print(f"  Total few-shot examples: {len(few_shot_data)}")
             print(f"  Cities with few-shot examples: {few_shot_data['city'].nunique()}")
     else:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
         print("No data to save.")
 
 def parse_arguments():
@@ -26,6 +26,9 @@ USAGE EXAMPLES:
 6. Use different data directory:
    python scripts/sample_all_data.py --data-dir /path/to/data --samples-per-city 75
 
+7. Copy all data as both CSV and Parquet:
+   python scripts/sample_all_data.py --mode all --format both
+
 OUTPUT FILES:
 ============
 
@@ -41,6 +44,7 @@ When copying all data (--mode all):
 - output_dir/all_meeting_minutes.csv
 - output_dir/all_reddit_comments.csv
 - output_dir/all_newspaper_articles.csv
+(with --format parquet or both, the same names with a .parquet extension)
 
 COMMAND LINE ARGUMENTS:
 ======================
@@ -49,15 +53,98 @@ COMMAND LINE ARGUMENTS:
 --samples-per-city: Number of samples per city (default: 50)
 --data-dir: Base data directory (default: data)
 --output-dir: Output directory (default: gold_standard for samples, all_data for all data)
+--format: 'csv' (default), 'parquet' or 'both' for --mode all; parquet requires pyarrow
 
 For help: python scripts/sample_all_data.py --help
 """
 
 import os
+import stat
+import numpy as np
 import pandas as pd
 import argparse
+import gc
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from tqdm import tqdm
-from utils import CITY_MAP
+from utils import CITY_MAP, READ_ERRORS, city_rng, write_parquet
+
+# Rows per chunk when streaming a city's file. Data files are always read
+# with memory_map=True so the parser reads straight from the page cache
+# instead of copying the file into its own buffer first.
+READ_CHUNK_SIZE = 100000
+
+# is_retweet only ever holds True/False, so it is parsed as a categorical
+# instead of one Python string per row
+TWITTER_DTYPES = {'is_retweet': 'category'}
+
+# Every data type the script handles, keyed by the data_type value written to
+# the outputs. subdir and filename locate a city's file ({city_dir} is filled
+# in per city); files without the required_col column are skipped, and filter_rt
+# drops retweets and removes near-duplicate tweets. sample_file and copy_name
+# name the outputs of the sample and all modes; sample_label and
+# no_rows_message word the sample mode's report.
+SOURCES = {
+    'twitter': {
+        'subdir': 'x',
+        'filename': 'posts_english_2015-2025_rt_deidentified.csv',
+        'required_col': 'is_retweet',
+        'filter_rt': True,
+        'label': 'Twitter posts',
+        'sample_label': 'Twitter',
+        'no_rows_message': 'No non-retweet tweets in {path}.',
+        'short_label': 'Twitter',
+        'sample_file': 'sampled_twitter_posts.csv',
+        'copy_name': 'all_twitter_posts',
+    },
+    'meeting_minutes': {
+        'subdir': 'meeting_minutes',
+        'filename': 'meeting_minutes_lexicon_matches_deidentified.csv',
+        'required_col': 'Deidentified_paragraph',
+        'filter_rt': False,
+        'label': 'meeting minutes',
+        'sample_label': 'Meeting minutes',
+        'no_rows_message': 'No meeting minutes data in {path}.',
+        'short_label': 'meeting minutes',
+        'sample_file': 'sampled_meeting_minutes.csv',
+        'copy_name': 'all_meeting_minutes',
+    },
+    'reddit': {
+        'subdir': 'reddit',
+        'filename': 'filtered_comments_deidentified.csv',
+        'required_col': 'Deidentified_Comment',
+        'filter_rt': False,
+        'label': 'Reddit comments',
+        'sample_label': 'Reddit comments',
+        'no_rows_message': 'No Reddit comments in {path}.',
+        'short_label': 'Reddit',
+        'sample_file': 'sampled_reddit_comments.csv',
+        'copy_name': 'all_reddit_comments',
+    },
+    'newspaper': {
+        'subdir': 'newspaper',
+        'filename': '{city_dir}_processed_articles_deidentified.csv',
+        'required_col': None,
+        'filter_rt': False,
+        'label': 'newspaper articles',
+        'sample_label': 'Newspaper articles',
+        'no_rows_message': 'No rows in {path}.',
+        'short_label': 'newspaper',
+        'sample_file': 'sampled_newspaper_articles.csv',
+        'copy_name': 'all_newspaper_articles',
+    },
+}
+
+# Per-file samples already drawn in this process, keyed by the job without its
+# sample size: job key -> (samples_per_city, sample, problem, error). The combined
+# sample reuses these instead of parsing every file a second time.
+_sample_cache = {}
+
+# Size in bytes of every data file looked up so far, or None where the file is
+# missing. Filled for all cities and data types at once by _scan_availability,
+# so later stages look files up here instead of stat-ing them again.
+_file_sizes = {}
 
 def create_output_directories(output_dirs):
     """Create output directories if they don't exist."""
@@ -159,34 +246,265 @@ def remove_twitter_duplicates(df, similarity_threshold=0.4):
     
     return deduplicated_df
 
-def sample_twitter_posts(base_data_dir='data', samples_per_city=50, output_file='gold_standard/sampled_twitter_posts.csv'):
-    """Sample Twitter posts from each city."""
+def _constant_column(value, length):
+    """Return a one-category Categorical repeating value, stored as one byte per row."""
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), categories=[value])
+
+def _fast_concat(frames):
+    """Concatenate per-city frames (any iterable), skipping the copy when there is only one."""
+    # Taking an iterable lets callers pass a generator, so the per-city frames
+    # are only referenced from here and are freed once the result exists
+    frames = list(frames)
+    if not frames:
+        return None
+    # The index is never written, so a lone frame can be used as it is
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+def _save_frame(df, output_dir, name, output_format='csv'):
+    """Save one frame as name.csv and/or name.parquet, returning the saved paths."""
+    paths = []
+    if output_format in ('csv', 'both'):
+        csv_path = os.path.join(output_dir, f'{name}.csv')
+        df.to_csv(csv_path, index=False)
+        paths.append(csv_path)
+    if output_format in ('parquet', 'both'):
+        parquet_path = os.path.join(output_dir, f'{name}.parquet')
+        if write_parquet(df, parquet_path):
+            paths.append(parquet_path)
+    return paths
+
+def _reservoir_sample_csv(path, n, rng):
+    """Sample up to n rows uniformly from a CSV read in chunks, returning (sample, candidate_count)."""
+    # Every candidate row gets a random key and the n rows with the smallest
+    # keys are kept (bottom-k reservoir sampling), so only one chunk plus the
+    # reservoir is ever held in memory. Sorting the reservoir by key leaves the
+    # rows in random order, which makes any prefix a uniform sample as well.
+    reservoir = None
+    reservoir_keys = np.empty(0)
+    seen = 0
+    for chunk in pd.read_csv(path, chunksize=READ_CHUNK_SIZE, memory_map=True):
+        keys = rng.random(len(chunk))
+        seen += len(chunk)
+        
+        # Once the reservoir is full, only rows beating its largest key matter
+        if len(reservoir_keys) >= n:
+            beats = keys < reservoir_keys.max() if n > 0 else np.zeros(len(keys), dtype=bool)
+            chunk = chunk[beats]
+            keys = keys[beats]
+        
+        if reservoir is not None:
+            chunk = pd.concat([reservoir, chunk])
+            keys = np.concatenate([reservoir_keys, keys])
+        if len(keys) > n:
+            keep = np.argpartition(keys, n)[:n]
+            chunk = chunk.take(keep)
+            keys = keys[keep]
+        reservoir, reservoir_keys = chunk, keys
+    
+    return reservoir.take(np.argsort(reservoir_keys, kind='stable')), seen
+
+def _sample_non_retweets(path, n, rng):
+    """Sample up to n non-retweets from a Twitter CSV, returning (sample, candidate_count)."""
+    # Retweets are dropped before any text is parsed: a first pass reads only
+    # the is_retweet column and runs the same bottom-k key selection over row
+    # numbers, then a second pass parses just the chosen rows. Splitting raw
+    # lines on commas instead would break on quoted commas and newlines in
+    # tweets. Blank lines are kept as rows here, so the row numbers line up
+    # with the ones skiprows sees.
+    best_rows = np.empty(0, dtype=np.int64)
+    best_keys = np.empty(0)
+    seen = 0
+    offset = 0
+    for chunk in pd.read_csv(path, usecols=['is_retweet'], dtype=TWITTER_DTYPES, chunksize=READ_CHUNK_SIZE,
+                             skip_blank_lines=False, memory_map=True):
+        # Handle both string and boolean values for is_retweet
+        rows = offset + np.flatnonzero(chunk['is_retweet'].isin([False, 'False']).to_numpy())
+        offset += len(chunk)
+        keys = rng.random(len(rows))
+        seen += len(rows)
+        
+        rows = np.concatenate([best_rows, rows])
+        keys = np.concatenate([best_keys, keys])
+        if len(keys) > n:
+            keep = np.argpartition(keys, n)[:n]
+            rows = rows[keep]
+            keys = keys[keep]
+        best_rows, best_keys = rows, keys
+    
+    # Values are kept as the text in the file, so a numeric column is written
+    # the same way whichever rows happen to be chosen
+    wanted = set((best_rows + 1).tolist())
+    sample = pd.read_csv(path, skiprows=lambda i: i != 0 and i not in wanted, dtype=str, memory_map=True)
+    if len(sample) != len(best_rows):
+        raise pd.errors.ParserError(f"expected {len(best_rows)} sampled rows, read {len(sample)}")
+    
+    # The second pass returns rows in file order; put them back in key order
+    order = np.argsort(best_keys, kind='stable')
+    return sample.take(np.searchsorted(np.sort(best_rows), best_rows[order])), seen
+
+def _load_and_sample(city, path, required_col, filter_rt, n, data_type):
+    """Read one city's file and sample up to n rows from it, returning (sample, problem, error)."""
+    # problem is None, 'no_column', 'no_rows' or 'error' (error then holds its
+    # text); _sample_cities adds 'missing' for files it never reads. The caller
+    # words the problem, since the sample and combined reports differ
+    try:
+        columns = pd.read_csv(path, nrows=0).columns
+        if required_col and required_col not in columns:
+            return None, 'no_column', None
+        if filter_rt:
+            sample, candidate_count = _sample_non_retweets(path, n, city_rng(city))
+        else:
+            sample, candidate_count = _reservoir_sample_csv(path, n, city_rng(city))
+        if candidate_count == 0:
+            return None, 'no_rows', None
+        sample = sample.assign(city=_constant_column(city, len(sample)),
+                               data_type=_constant_column(data_type, len(sample)))
+        return sample, None, None
+    except READ_ERRORS as e:
+        return None, 'error', str(e)
+
+def _problem_message(job, problem, error, combined=False):
+    """Word a _load_and_sample problem for the sample report, or for the combined one (errors only)."""
+    city, path, required_col, filter_rt, n, data_type = job
+    if combined:
+        if problem == 'error':
+            return f"Error processing {SOURCES[data_type]['short_label']} for {city}: {error}"
+        return None
+    if problem == 'missing':
+        return f"File not found: {path}"
+    if problem == 'no_column':
+        return f"'{required_col}' column not found in {path}. Skipping."
+    if problem == 'no_rows':
+        return SOURCES[data_type]['no_rows_message'].format(path=path)
+    if problem == 'error':
+        return f"Error processing {path}: {error}"
+    return None
+
+def _invalidate_cache():
+    """Forget every cached per-file sample and file size, e.g. after the data files change."""
+    _sample_cache.clear()
+    _file_sizes.clear()
+
+def _cached_sample(job):
+    """Return (sample, problem, error) for a job from the cache, or None if it must be read."""
+    city, path, required_col, filter_rt, n, data_type = job
+    cached = _sample_cache.get((city, path, required_col, filter_rt, data_type))
+    if cached is None or cached[0] < n:
+        return None
+    # Rows of a cached sample are in key order, so its first n rows are exactly
+    # the sample a fresh read with the same seed would have drawn for n
+    _, sample, problem, error = cached
+    if sample is not None:
+        sample = sample.head(n).copy()
+    return sample, problem, error
+
+def _sample_cities(jobs, executor=None, combined=False):
+    """Run _load_and_sample for each job in a process pool, returning samples in job order."""
+    # Cities share no data, so their files are parsed in parallel worker
+    # processes; only the small samples are sent back to this process
     all_samples = []
-    for city, city_dir in tqdm(CITY_MAP.items(), desc="Processing cities"):
-        x_dir = os.path.join(base_data_dir, city_dir, 'x')
-        posts_path = os.path.join(x_dir, 'posts_english_2015-2025_rt_deidentified.csv')
-        if not os.path.isfile(posts_path):
-            print(f"File not found: {posts_path}")
-            continue
-        try:
-            df = pd.read_csv(posts_path)
-            if 'is_retweet' not in df.columns:
-                print(f"'is_retweet' column not found in {posts_path}. Skipping.")
-                continue
-            # Handle both string and boolean values for is_retweet
-            non_rt = df[df['is_retweet'].isin([False, 'False'])]
-            if non_rt.empty:
-                print(f"No non-retweet tweets in {posts_path}.")
-                continue
-            sample = non_rt.sample(n=min(samples_per_city, len(non_rt)), random_state=42)
-            sample['city'] = city
-            sample['data_type'] = 'twitter'
+    if not jobs:
+        return all_samples
+    # Missing files need no read; they are reported in city order with the rest
+    results = {i: (None, 'missing', None) if _file_sizes.get(job[1]) is None else _cached_sample(job)
+               for i, job in enumerate(jobs)}
+    pending = [i for i, result in results.items() if result is None]
+    if pending and executor is None:
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(pending))) as executor:
+            return _sample_cities(jobs, executor, combined)
+    
+    # Submit the largest files first so the pool is not left waiting on one
+    # big file at the end; results are still reported in city order
+    by_size = sorted(pending, key=lambda i: _file_sizes.get(jobs[i][1]) or 0, reverse=True)
+    futures = {i: executor.submit(_load_and_sample, *jobs[i]) for i in by_size}
+    for i in tqdm(range(len(jobs)), desc="Processing cities"):
+        if i in futures:
+            city, path, required_col, filter_rt, n, data_type = jobs[i]
+            results[i] = futures[i].result()
+            _sample_cache[(city, path, required_col, filter_rt, data_type)] = (n,) + results[i]
+        sample, problem, error = results[i]
+        message = _problem_message(jobs[i], problem, error, combined)
+        if message:
+            print(message)
+        if sample is not None:
             all_samples.append(sample)
-        except Exception as e:
-            print(f"Error processing {posts_path}: {e}")
-    if all_samples:
-        combined = pd.concat(all_samples, ignore_index=True)
-        
+    return all_samples
+
+def _source_path(base_data_dir, city_dir, data_type):
+    """Return the path of one city's file for one data type."""
+    spec = SOURCES[data_type]
+    return os.path.join(base_data_dir, city_dir, spec['subdir'], spec['filename'].format(city_dir=city_dir))
+
+def _probe(path):
+    """Return a file's size in bytes, or None if it is missing or not a regular file."""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return info.st_size if stat.S_ISREG(info.st_mode) else None
+
+def _scan_availability(base_data_dir):
+    """Stat every city's file for every data type in parallel and record the results in _file_sizes."""
+    # The stats are independent, so on networked storage their latency overlaps
+    paths = [_source_path(base_data_dir, city_dir, data_type)
+             for data_type in SOURCES for city_dir in CITY_MAP.values()]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        _file_sizes.update(zip(paths, pool.map(_probe, paths)))
+
+def _source_paths(base_data_dir, data_type):
+    """Return (city, path, exists) for every city's file of one data type."""
+    paths = [(city, _source_path(base_data_dir, city_dir, data_type)) for city, city_dir in CITY_MAP.items()]
+    if any(path not in _file_sizes for _, path in paths):
+        _scan_availability(base_data_dir)
+    return [(city, path, _file_sizes[path] is not None) for city, path in paths]
+
+def _prefetch(path):
+    """Start pulling a file into the OS page cache so a later read finds it there."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if hasattr(os, 'posix_fadvise'):
+                # The kernel reads ahead in the background; this returns at once
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            else:
+                # Otherwise read the file through once and throw the bytes away
+                while os.read(fd, 1 << 20):
+                    pass
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+def _prefetched(entries):
+    """Yield _source_paths entries, prefetching the next existing file while the current one is parsed."""
+    entries = list(entries)
+    for i, entry in enumerate(entries):
+        next_path = next((path for _, path, exists in entries[i + 1:] if exists), None)
+        if next_path is not None:
+            threading.Thread(target=_prefetch, args=(next_path,), daemon=True).start()
+        yield entry
+
+def _city_jobs(base_data_dir, data_type, n):
+    """Build one _load_and_sample job per city; _sample_cities reports the ones whose file is missing."""
+    spec = SOURCES[data_type]
+    return [(city, path, spec['required_col'], spec['filter_rt'], n, data_type)
+            for city, path, _ in _source_paths(base_data_dir, data_type)]
+
+def sample_source(data_type, base_data_dir='data', samples_per_city=50, output_file=None, executor=None):
+    """Sample one data type from each city and save the samples to a CSV file."""
+    spec = SOURCES[data_type]
+    if output_file is None:
+        output_file = os.path.join('gold_standard', spec['sample_file'])
+    jobs = _city_jobs(base_data_dir, data_type, samples_per_city)
+    all_samples = _sample_cities(jobs, executor)
+    if not all_samples:
+        print(f"No {spec['short_label']} samples collected.")
+        return
+    
+    combined = _fast_concat(all_samples)
+    if spec['filter_rt']:
         # Remove duplicates before saving
         original_count = len(combined)
         combined = remove_twitter_duplicates(combined, similarity_threshold=0.8)
@@ -195,208 +513,161 @@ def sample_twitter_posts(base_data_dir='data', samples_per_city=50, output_file=
         
         if removed_count > 0:
             print(f"Removed {removed_count} duplicate tweets from sample")
-        
-        combined.to_csv(output_file, index=False)
-        print(f"Twitter sample saved to {output_file} ({len(combined)} total samples)")
-    else:
-        print("No Twitter samples collected.")
+    
+    combined.to_csv(output_file, index=False)
+    print(f"{spec['sample_label']} sample saved to {output_file} ({len(combined)} total samples)")
 
-def sample_meeting_minutes(base_data_dir='data', samples_per_city=50, output_file='gold_standard/sampled_meeting_minutes.csv'):
-    """Sample meeting minutes from each city."""
-    all_samples = []
-    for city, city_dir in CITY_MAP.items():
-        meeting_minutes_dir = os.path.join(base_data_dir, city_dir, 'meeting_minutes')
-        meeting_minutes_path = os.path.join(meeting_minutes_dir, 'meeting_minutes_lexicon_matches_deidentified.csv')
-        if not os.path.isfile(meeting_minutes_path):
-            print(f"File not found: {meeting_minutes_path}")
-            continue
-        try:
-            df = pd.read_csv(meeting_minutes_path)
-            if 'Deidentified_paragraph' not in df.columns:
-                print(f"'Deidentified_paragraph' column not found in {meeting_minutes_path}. Skipping.")
-                continue
-            if df.empty:
-                print(f"No meeting minutes data in {meeting_minutes_path}.")
-                continue
-            sample = df.sample(n=min(samples_per_city, len(df)), random_state=42)
-            sample['city'] = city
-            sample['data_type'] = 'meeting_minutes'
-            all_samples.append(sample)
-        except Exception as e:
-            print(f"Error processing {meeting_minutes_path}: {e}")
-    if all_samples:
-        combined = pd.concat(all_samples, ignore_index=True)
-        combined.to_csv(output_file, index=False)
-        print(f"Meeting minutes sample saved to {output_file} ({len(combined)} total samples)")
-    else:
-        print("No meeting minutes samples collected.")
+def _read_city_file(path, spec):
+    """Read one city's file for copying, or return None if it lacks the required column."""
+    columns = pd.read_csv(path, nrows=0).columns
+    if spec['required_col'] and spec['required_col'] not in columns:
+        return None
+    if not spec['filter_rt']:
+        return pd.read_csv(path, memory_map=True)
+    
+    # Drop retweets chunk by chunk while reading, so the
+    # retweets are never all held in memory at once
+    chunks = []
+    for chunk in pd.read_csv(path, chunksize=READ_CHUNK_SIZE, dtype=TWITTER_DTYPES, memory_map=True):
+        # Convert is_retweet to string to handle boolean values properly
+        chunk['is_retweet'] = chunk['is_retweet'].astype(str)
+        chunks.append(chunk[chunk['is_retweet'] != 'True'])
+    return _fast_concat(chunks)
 
-def sample_reddit_comments(base_data_dir='data', samples_per_city=50, output_file='gold_standard/sampled_reddit_comments.csv'):
-    """Sample Reddit comments from each city."""
-    all_samples = []
-    for city, city_dir in CITY_MAP.items():
-        reddit_dir = os.path.join(base_data_dir, city_dir, 'reddit')
-        reddit_path = os.path.join(reddit_dir, 'filtered_comments_deidentified.csv')
-        if not os.path.isfile(reddit_path):
-            print(f"File not found: {reddit_path}")
+def _iter_city_frames(base_data_dir, data_type, report=True):
+    """Yield every city's full frame for one data type, tagged with its city."""
+    spec = SOURCES[data_type]
+    for city, path, exists in _prefetched(_source_paths(base_data_dir, data_type)):
+        if not exists:
             continue
         try:
-            df = pd.read_csv(reddit_path)
-            if 'Deidentified_Comment' not in df.columns:
-                print(f"'Deidentified_Comment' column not found in {reddit_path}. Skipping.")
-                continue
-            if df.empty:
-                print(f"No Reddit comments in {reddit_path}.")
-                continue
-            sample = df.sample(n=min(samples_per_city, len(df)), random_state=42)
-            sample['city'] = city
-            sample['data_type'] = 'reddit'
-            all_samples.append(sample)
-        except Exception as e:
-            print(f"Error processing {reddit_path}: {e}")
-    if all_samples:
-        combined = pd.concat(all_samples, ignore_index=True)
-        combined.to_csv(output_file, index=False)
-        print(f"Reddit comments sample saved to {output_file} ({len(combined)} total samples)")
-    else:
-        print("No Reddit samples collected.")
+            df = _read_city_file(path, spec)
+        except READ_ERRORS as e:
+            if report:
+                print(f"Error processing {spec['short_label']} for {city}: {e}")
+            continue
+        if df is None or df.empty:
+            continue
+        df = df.assign(city=_constant_column(city, len(df)))
+        if report:
+            print(f"  {city}: {len(df)} {spec['label']}")
+        yield df
 
-def sample_newspaper_articles(base_data_dir='data', samples_per_city=50, output_file='gold_standard/sampled_newspaper_articles.csv'):
-    """Sample newspaper articles from each city."""
-    all_samples = []
-    for city, city_dir in CITY_MAP.items():
-        news_dir = os.path.join(base_data_dir, city_dir, 'newspaper')
-        news_path = os.path.join(news_dir, f'{city_dir}_processed_articles_deidentified.csv')
-        if not os.path.isfile(news_path):
-            print(f"File not found: {news_path}")
+def _stream_city_files(base_data_dir, data_type, output_file):
+    """Copy every city's file for one data type into one CSV a chunk at a time, returning the row count."""
+    spec = SOURCES[data_type]
+    
+    # First pass reads one row per file, to pick the files worth copying and
+    # the output columns in the order a concat of the files would give them
+    files = []
+    columns = []
+    for city, path, exists in _source_paths(base_data_dir, data_type):
+        if not exists:
             continue
         try:
-            df = pd.read_csv(news_path)
-            if df.empty:
-                print(f"No rows in {news_path}.")
+            head = pd.read_csv(path, nrows=1)
+        except READ_ERRORS as e:
+            print(f"Error processing {spec['short_label']} for {city}: {e}")
+            continue
+        if head.empty or (spec['required_col'] and spec['required_col'] not in head.columns):
+            continue
+        files.append((city, path, True))
+        for column in list(head.columns) + ['city']:
+            if column not in columns:
+                columns.append(column)
+    if not files:
+        return 0
+    
+    # Second pass streams each file through as text, so only one chunk is in
+    # memory at a time and values are written exactly as they appear in the source
+    rows = 0
+    with open(output_file, 'w', newline='') as out:
+        pd.DataFrame(columns=columns).to_csv(out, index=False)
+        for city, path, _ in _prefetched(files):
+            start = out.tell()
+            city_rows = 0
+            try:
+                for chunk in pd.read_csv(path, chunksize=READ_CHUNK_SIZE, dtype=str, memory_map=True):
+                    chunk.assign(city=city).reindex(columns=columns).to_csv(out, index=False, header=False)
+                    city_rows += len(chunk)
+            except READ_ERRORS as e:
+                # Drop the part of this city's file that was already written
+                out.seek(start)
+                out.truncate()
+                print(f"Error processing {spec['short_label']} for {city}: {e}")
                 continue
-            sample = df.sample(n=min(samples_per_city, len(df)), random_state=42)
-            sample['city'] = city
-            sample['data_type'] = 'newspaper'
-            all_samples.append(sample)
-        except Exception as e:
-            print(f"Error processing {news_path}: {e}")
-    if all_samples:
-        combined = pd.concat(all_samples, ignore_index=True)
-        combined.to_csv(output_file, index=False)
-        print(f"Newspaper articles sample saved to {output_file} ({len(combined)} total samples)")
-    else:
-        print("No newspaper samples collected.")
+            rows += city_rows
+            print(f"  {city}: {city_rows} {spec['label']}")
+    if rows == 0:
+        os.remove(output_file)
+    return rows
+
+def _copy_source(base_data_dir, data_type, output_dir, name, output_format='csv'):
+    """Copy one data type to name.csv and/or name.parquet, returning (saved paths, row count)."""
+    paths = []
+    rows = 0
+    if output_format in ('csv', 'both'):
+        csv_path = os.path.join(output_dir, f'{name}.csv')
+        rows = _stream_city_files(base_data_dir, data_type, csv_path)
+        if rows:
+            paths.append(csv_path)
+    if output_format in ('parquet', 'both'):
+        # Parquet is written from one frame, so this part is not streamed
+        combined = _fast_concat(_iter_city_frames(base_data_dir, data_type, report=(output_format == 'parquet')))
+        if combined is not None:
+            rows = len(combined)
+            parquet_path = os.path.join(output_dir, f'{name}.parquet')
+            if write_parquet(combined, parquet_path):
+                paths.append(parquet_path)
+    return paths, rows
 
-def copy_all_data(base_data_dir='data', output_dir='all_data'):
-    """Copy all data (not samples) to separate CSV files by data type."""
+def _copy_twitter(base_data_dir, output_dir, name, output_format='csv'):
+    """Copy every city's non-retweets with duplicates removed, returning (saved paths, row count)."""
+    # The per-city frames come from a generator, so they are released as soon
+    # as they have been concatenated
+    twitter_combined = _fast_concat(_iter_city_frames(base_data_dir, 'twitter'))
+    if twitter_combined is None:
+        return [], 0
+    
+    # Remove duplicates before saving
+    original_count = len(twitter_combined)
+    twitter_combined = remove_twitter_duplicates(twitter_combined, similarity_threshold=0.8)
+    deduplicated_count = len(twitter_combined)
+    removed_count = original_count - deduplicated_count
+    
+    if removed_count > 0:
+        print(f"Removed {removed_count} duplicate tweets from complete dataset")
+    
+    return _save_frame(twitter_combined, output_dir, name, output_format), len(twitter_combined)
+
+def copy_all_data(base_data_dir='data', output_dir='all_data', output_format='csv'):
+    """Copy all data (not samples) to separate CSV and/or Parquet files by data type."""
     
     # Create output directory
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Created directory: {output_dir}")
     
-    # Twitter posts
-    print("Copying all Twitter posts...")
-    twitter_all = []
-    for city, city_dir in CITY_MAP.items():
-        x_dir = os.path.join(base_data_dir, city_dir, 'x')
-        posts_path = os.path.join(x_dir, 'posts_english_2015-2025_rt_deidentified.csv')
-        if os.path.isfile(posts_path):
-            try:
-                df = pd.read_csv(posts_path)
-                if 'is_retweet' in df.columns:
-                    # Convert is_retweet to string to handle boolean values properly
-                    df['is_retweet'] = df['is_retweet'].astype(str)
-                    non_rt = df[df['is_retweet'] != 'True']
-                    if not non_rt.empty:
-                        non_rt['city'] = city
-                        twitter_all.append(non_rt)
-                        print(f"  {city}: {len(non_rt)} Twitter posts")
-            except Exception as e:
-                print(f"Error processing Twitter for {city}: {e}")
-    
-    if twitter_all:
-        twitter_combined = pd.concat(twitter_all, ignore_index=True)
-        
-        # Remove duplicates before saving
-        original_count = len(twitter_combined)
-        twitter_combined = remove_twitter_duplicates(twitter_combined, similarity_threshold=0.8)
-        deduplicated_count = len(twitter_combined)
-        removed_count = original_count - deduplicated_count
-        
-        if removed_count > 0:
-            print(f"Removed {removed_count} duplicate tweets from complete dataset")
+    # Find every input file up front, once
+    _scan_availability(base_data_dir)
+    
+    # Each data type is copied inside its own function, so its frames are freed
+    # before the next one is read; only the counts are kept for the summary
+    summary = {}
+    for i, (data_type, spec) in enumerate(SOURCES.items()):
+        label = spec['label'][0].upper() + spec['label'][1:]
+        if i > 0:
+            print()
+        print(f"Copying all {spec['label']}...")
+        if spec['filter_rt']:
+            outputs, rows = _copy_twitter(base_data_dir, output_dir, spec['copy_name'], output_format)
+        else:
+            outputs, rows = _copy_source(base_data_dir, data_type, output_dir, spec['copy_name'], output_format)
+        gc.collect()
         
-        twitter_output = os.path.join(output_dir, 'all_twitter_posts.csv')
-        twitter_combined.to_csv(twitter_output, index=False)
-        print(f"Twitter posts saved to {twitter_output} ({len(twitter_combined)} total)")
-    
-    # Meeting minutes
-    print("\nCopying all meeting minutes...")
-    meeting_all = []
-    for city, city_dir in CITY_MAP.items():
-        meeting_minutes_dir = os.path.join(base_data_dir, city_dir, 'meeting_minutes')
-        meeting_minutes_path = os.path.join(meeting_minutes_dir, 'meeting_minutes_lexicon_matches_deidentified.csv')
-        if os.path.isfile(meeting_minutes_path):
-            try:
-                df = pd.read_csv(meeting_minutes_path)
-                if 'Deidentified_paragraph' in df.columns and not df.empty:
-                    df['city'] = city
-                    meeting_all.append(df)
-                    print(f"  {city}: {len(df)} meeting minutes")
-            except Exception as e:
-                print(f"Error processing meeting minutes for {city}: {e}")
-    
-    if meeting_all:
-        meeting_combined = pd.concat(meeting_all, ignore_index=True)
-        meeting_output = os.path.join(output_dir, 'all_meeting_minutes.csv')
-        meeting_combined.to_csv(meeting_output, index=False)
-        print(f"Meeting minutes saved to {meeting_output} ({len(meeting_combined)} total)")
-    
-    # Reddit comments
-    print("\nCopying all Reddit comments...")
-    reddit_all = []
-    for city, city_dir in CITY_MAP.items():
-        reddit_dir = os.path.join(base_data_dir, city_dir, 'reddit')
-        reddit_path = os.path.join(reddit_dir, 'filtered_comments_deidentified.csv')
-        if os.path.isfile(reddit_path):
-            try:
-                df = pd.read_csv(reddit_path)
-                if 'Deidentified_Comment' in df.columns and not df.empty:
-                    df['city'] = city
-                    reddit_all.append(df)
-                    print(f"  {city}: {len(df)} Reddit comments")
-            except Exception as e:
-                print(f"Error processing Reddit for {city}: {e}")
-    
-    if reddit_all:
-        reddit_combined = pd.concat(reddit_all, ignore_index=True)
-        reddit_output = os.path.join(output_dir, 'all_reddit_comments.csv')
-        reddit_combined.to_csv(reddit_output, index=False)
-        print(f"Reddit comments saved to {reddit_output} ({len(reddit_combined)} total)")
-    
-    # Newspaper articles
-    print("\nCopying all newspaper articles...")
-    newspaper_all = []
-    for city, city_dir in CITY_MAP.items():
-        news_dir = os.path.join(base_data_dir, city_dir, 'newspaper')
-        news_path = os.path.join(news_dir, f'{city_dir}_processed_articles_deidentified.csv')
-        if os.path.isfile(news_path):
-            try:
-                df = pd.read_csv(news_path)
-                if not df.empty:
-                    df['city'] = city
-                    newspaper_all.append(df)
-                    print(f"  {city}: {len(df)} newspaper articles")
-            except Exception as e:
-                print(f"Error processing newspaper for {city}: {e}")
-    
-    if newspaper_all:
-        newspaper_combined = pd.concat(newspaper_all, ignore_index=True)
-        newspaper_output = os.path.join(output_dir, 'all_newspaper_articles.csv')
-        newspaper_combined.to_csv(newspaper_output, index=False)
-        print(f"Newspaper articles saved to {newspaper_output} ({len(newspaper_combined)} total)")
+        if rows:
+            print(f"{label} saved to {', '.join(outputs)} ({rows} total)")
+            summary[label] = (len(outputs), rows)
     
     # Summary
     print("\n" + "="*50)
@@ -404,25 +675,10 @@ def copy_all_data(base_data_dir='data', output_dir='all_data'):
     total_files = 0
     total_rows = 0
     
-    if twitter_all:
-        print(f"Twitter posts: {len(twitter_combined)} rows")
-        total_files += 1
-        total_rows += len(twitter_combined)
-    
-    if meeting_all:
-        print(f"Meeting minutes: {len(meeting_combined)} rows")
-        total_files += 1
-        total_rows += len(meeting_combined)
-    
-    if reddit_all:
-        print(f"Reddit comments: {len(reddit_combined)} rows")
-        total_files += 1
-        total_rows += len(reddit_combined)
-    
-    if newspaper_all:
-        print(f"Newspaper articles: {len(newspaper_combined)} rows")
-        total_files += 1
-        total_rows += len(newspaper_combined)
+    for label, (files, rows) in summary.items():
+        print(f"{label}: {rows} rows")
+        total_files += files
+        total_rows += rows
     
     print(f"Total files created: {total_files}")
     print(f"Total rows across all files: {total_rows}")
@@ -434,117 +690,59 @@ def copy_all_data(base_data_dir='data', output_dir='all_data'):
 def sample_all_data(base_data_dir='data', samples_per_city=50):
     """Sample all data types and create individual files plus a combined file."""
     
-    # Define output directories and files
+    # Define output directories
     output_dirs = ['gold_standard']
-    output_files = [
-        'gold_standard/sampled_twitter_posts.csv',
-        'gold_standard/sampled_meeting_minutes.csv',
-        'gold_standard/sampled_reddit_comments.csv',
-        'gold_standard/sampled_newspaper_articles.csv',
-        'gold_standard/combined_sample.csv'
-    ]
     
     # Create output directories
     create_output_directories(output_dirs)
     
-    # Sample each data type
-    print(f"Sampling {samples_per_city} samples per city...")
-    print("\nSampling Twitter posts...")
-    sample_twitter_posts(base_data_dir, samples_per_city, output_files[0])
-    
-    print("\nSampling meeting minutes...")
-    sample_meeting_minutes(base_data_dir, samples_per_city, output_files[1])
+    # Find every input file up front, once, instead of once per stage
+    _scan_availability(base_data_dir)
     
-    print("\nSampling Reddit comments...")
-    sample_reddit_comments(base_data_dir, samples_per_city, output_files[2])
-    
-    print("\nSampling newspaper articles...")
-    sample_newspaper_articles(base_data_dir, samples_per_city, output_files[3])
-    
-    # Create combined file
-    print("\nCreating combined sample file...")
-    create_combined_sample(base_data_dir, samples_per_city, output_files[4])
+    # Sample each data type. One worker pool is shared by every stage instead
+    # of starting a fresh set of processes for each data type.
+    print(f"Sampling {samples_per_city} samples per city...")
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        for data_type, spec in SOURCES.items():
+            print(f"\nSampling {spec['label']}...")
+            sample_source(data_type, base_data_dir, samples_per_city,
+                          os.path.join('gold_standard', spec['sample_file']), executor)
+        
+        # Create combined file
+        print("\nCreating combined sample file...")
+        create_combined_sample(base_data_dir, samples_per_city, 'gold_standard/combined_sample.csv', executor)
 
-def create_combined_sample(base_data_dir='data', samples_per_city=50, output_file='gold_standard/combined_sample.csv'):
+def create_combined_sample(base_data_dir='data', samples_per_city=50, output_file='gold_standard/combined_sample.csv', executor=None):
     """Create a combined sample with all data types."""
-    all_combined = []
-    
     # Calculate samples per data type for balanced representation
     samples_per_data_type = samples_per_city // 4
     
-    # Twitter posts
-    for city, city_dir in CITY_MAP.items():
-        x_dir = os.path.join(base_data_dir, city_dir, 'x')
-        posts_path = os.path.join(x_dir, 'posts_english_2015-2025_rt_deidentified.csv')
-        if os.path.isfile(posts_path):
-            try:
-                df = pd.read_csv(posts_path)
-                if 'is_retweet' in df.columns:
-                    # Convert is_retweet to string to handle boolean values properly
-                    df['is_retweet'] = df['is_retweet'].astype(str)
-                    non_rt = df[df['is_retweet'] != 'True']
-                    if not non_rt.empty:
-                        sample = non_rt.sample(n=min(samples_per_data_type, len(non_rt)), random_state=42)
-                        sample['city'] = city
-                        sample['data_type'] = 'twitter'
-                        all_combined.append(sample)
-            except Exception as e:
-                print(f"Error processing Twitter for {city}: {e}")
-    
-    # Meeting minutes
-    for city, city_dir in CITY_MAP.items():
-        meeting_minutes_dir = os.path.join(base_data_dir, city_dir, 'meeting_minutes')
-        meeting_minutes_path = os.path.join(meeting_minutes_dir, 'meeting_minutes_lexicon_matches_deidentified.csv')
-        if os.path.isfile(meeting_minutes_path):
-            try:
-                df = pd.read_csv(meeting_minutes_path)
-                if 'Deidentified_paragraph' in df.columns and not df.empty:
-                    sample = df.sample(n=min(samples_per_data_type, len(df)), random_state=42)
-                    sample['city'] = city
-                    sample['data_type'] = 'meeting_minutes'
-                    all_combined.append(sample)
-            except Exception as e:
-                print(f"Error processing meeting minutes for {city}: {e}")
-    
-    # Reddit comments
-    for city, city_dir in CITY_MAP.items():
-        reddit_dir = os.path.join(base_data_dir, city_dir, 'reddit')
-        reddit_path = os.path.join(reddit_dir, 'filtered_comments_deidentified.csv')
-        if os.path.isfile(reddit_path):
-            try:
-                df = pd.read_csv(reddit_path)
-                if 'Deidentified_Comment' in df.columns and not df.empty:
-                    sample = df.sample(n=min(samples_per_data_type, len(df)), random_state=42)
-                    sample['city'] = city
-                    sample['data_type'] = 'reddit'
-                    all_combined.append(sample)
-            except Exception as e:
-                print(f"Error processing Reddit for {city}: {e}")
-    
-    # Newspaper articles
-    for city, city_dir in CITY_MAP.items():
-        news_dir = os.path.join(base_data_dir, city_dir, 'newspaper')
-        news_path = os.path.join(news_dir, f'{city_dir}_processed_articles_deidentified.csv')
-        if os.path.isfile(news_path):
-            try:
-                df = pd.read_csv(news_path)
-                if not df.empty:
-                    sample = df.sample(n=min(samples_per_data_type, len(df)), random_state=42)
-                    sample['city'] = city
-                    sample['data_type'] = 'newspaper'
-                    all_combined.append(sample)
-            except Exception as e:
-                print(f"Error processing newspaper for {city}: {e}")
+    # Build every city/data type job up front so all files are parsed in one pool
+    jobs = []
+    for data_type in SOURCES:
+        jobs += _city_jobs(base_data_dir, data_type, samples_per_data_type)
+    all_combined = _sample_cities(jobs, executor, combined=True)
     
     if all_combined:
-        combined = pd.concat(all_combined, ignore_index=True)
+        # Each sample holds one city and one data type, so the distributions
+        # are counted per sample instead of rescanning the combined frame
+        type_counts = Counter()
+        city_counts = Counter()
+        for sample in all_combined:
+            if len(sample):
+                type_counts[sample['data_type'].iat[0]] += len(sample)
+                city_counts[sample['city'].iat[0]] += len(sample)
+        
+        combined = _fast_concat(all_combined)
         combined.to_csv(output_file, index=False)
         print(f"Combined sample saved to {output_file}")
         print(f"Total samples: {len(combined)}")
         print("Data type distribution:")
-        print(combined['data_type'].value_counts())
+        for data_type, count in type_counts.most_common():
+            print(f"  {data_type}: {count}")
         print("\nCity distribution:")
-        print(combined['city'].value_counts())
+        for city, count in city_counts.most_common():
+            print(f"  {city}: {count}")
     else:
         print("No samples collected for combined file.")
 
@@ -564,6 +762,9 @@ def parse_arguments():
     parser.add_argument('--output-dir', default=None,
                        help='Output directory (default: gold_standard for samples, complete_dataset for all data)')
     
+    parser.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv',
+                       help='Output format for --mode all; parquet requires pyarrow (default: csv)')
+    
     return parser.parse_args()
 
 if __name__ == '__main__':
@@ -582,8 +783,9 @@ if __name__ == '__main__':
     
     if args.mode == 'all':
         print(f"Output directory: {args.output_dir}")
+        print(f"Output format: {args.format}")
         print("=" * 30)
-        copy_all_data(args.data_dir, args.output_dir)
+        copy_all_data(args.data_dir, args.output_dir, args.format)
     else:
         print(f"Samples per city: {args.samples_per_city}")
         print(f"Output directory: {args.output_dir}")
@@ -10,18 +10,24 @@ USAGE:
 python scripts/sample_news_with_processed_articles.py --samples-per-city 50
 python scripts/sample_news_with_processed_articles.py --cities baltimore,portland
 python scripts/sample_news_with_processed_articles.py --output-dir custom_samples
+python scripts/sample_news_with_processed_articles.py --no-cache
+python scripts/sample_news_with_processed_articles.py --format both
 
 OUTPUT:
 =======
 - gold_standard/sampled_lexisnexis_news.csv
 - gold_standard/few_shot_news_examples.csv (preserved examples)
+(with --format parquet or both, the same names with a .parquet extension)
 """
 
 import os
+import mmap
+import numpy as np
 import pandas as pd
 import argparse
-import random
-from utils import CITY_MAP
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from utils import CITY_MAP, city_rng, read_csv_columns, write_parquet
 
 # The 5 few-shot examples to search for in processed articles
 FEW_SHOT_EXAMPLES = [
@@ -32,6 +38,35 @@ FEW_SHOT_EXAMPLES = [
     "I would imagine she is not being delusional about being unsafe on the streets, [ORGANIZATION], executive director of [ORGANIZATION], told [ORGANIZATION]. [PERSON] specializes in treating mentally ill homeless people. Somewhere in all of this is a hook around the fear she has of being unsafe, especially as a woman who is homeless, and that is not uncommon. There should be a real conversation about that, and it could be very useful for figuring out whats going on with her."
 ]
 
+# Columns of the processed article files that are used; the rest are never read
+ARTICLE_COLUMNS = ['city', 'article_date', 'article_source', 'city_source', 'keywords_matched',
+                   'Deidentified_article_title', 'Deidentified_paragraph_text']
+
+# Low-cardinality article columns, parsed as categoricals instead of one string per row
+ARTICLE_DTYPES = {'city': 'category', 'article_source': 'category', 'city_source': 'category'}
+
+# Rows per chunk when scanning a city's articles for the few-shot examples
+READ_CHUNK_SIZE = 100000
+
+# The examples with whitespace normalized, as they are compared against articles
+CLEAN_FEW_SHOT = tuple(' '.join(example_text.split()) for example_text in FEW_SHOT_EXAMPLES)
+
+# The words of each example as raw bytes, longest first. A file can only hold an
+# example if every word appears verbatim in it, whatever whitespace separates them;
+# words with a quote are left out since CSV escaping doubles it on disk
+FEW_SHOT_WORDS = tuple(
+    tuple(sorted({word.encode('utf-8') for word in example_text.split() if '"' not in word}, key=lambda word: (-len(word), word)))
+    for example_text in CLEAN_FEW_SHOT
+)
+
+# Few-shot search results from earlier runs, keyed on each processed file's
+# path, modification time and size, so unchanged files are not scanned again
+FEW_SHOT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'peh_fewshot.pkl')
+
+# Part of every cache key; bump it whenever the search rules change so results
+# cached under the old rules are not reused
+FEW_SHOT_CACHE_VERSION = 3
+
 def create_output_directories(output_dirs):
     """Create output directories if they don't exist."""
     for dir_path in output_dirs:
@@ -39,128 +74,265 @@ def create_output_directories(output_dirs):
             os.makedirs(dir_path)
             print(f"Created directory: {dir_path}")
 
-def find_few_shot_examples_in_articles(base_data_dir='data'):
+def discover_city_files(base_data_dir='data', city_map=CITY_MAP):
+    """Build each city's processed-article and Reddit paths once, noting which files exist."""
+    city_files = []
+    for city, city_dir in city_map.items():
+        processed_path = os.path.join(base_data_dir, city_dir, 'newspaper',
+                                      f'{city_dir}_processed_articles_deidentified.csv')
+        reddit_path = os.path.join(base_data_dir, city_dir, 'reddit', 'filtered_comments_deidentified.csv')
+        city_files.append({
+            'city': city,
+            'processed_path': processed_path,
+            'processed_exists': os.path.isfile(processed_path),
+            'reddit_path': reddit_path,
+            'reddit_exists': os.path.isfile(reddit_path),
+        })
+    return city_files
+
+def _candidate_examples(processed_path):
+    """Return the indices of the examples whose words all appear in the raw bytes of a file."""
+    with open(processed_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return [example_index for example_index, words in enumerate(FEW_SHOT_WORDS)
+                    if all(mm.find(word) != -1 for word in words)]
+
+def _scan_city_few_shot(files):
+    """Search one city's processed articles and return its matches along with status messages."""
+    found_examples = []
+    messages = []
+    city = files['city']
+    processed_path = files['processed_path']
+    
+    if files['processed_exists']:
+        try:
+            # Reading the header checks the file has the needed columns
+            pd.read_csv(processed_path, usecols=ARTICLE_COLUMNS, nrows=0)
+            
+            # A byte scan of the whole file rules out the examples it cannot
+            # hold, so a file with none of them is never parsed
+            remaining = _candidate_examples(processed_path)
+            if not remaining:
+                return found_examples, messages, True
+            
+            # Read only the needed columns, a chunk at a time, keeping each example
+            # at its first occurrence and stopping once all of them have been seen
+            with read_csv_columns(processed_path, ARTICLE_COLUMNS, ARTICLE_DTYPES,
+                                  chunksize=READ_CHUNK_SIZE) as reader:
+                for processed_df in reader:
+                    # Normalize every article's whitespace in one pass, then test
+                    # each example still missing against the whole column at once
+                    clean_articles = processed_df['Deidentified_paragraph_text'].str.split().str.join(' ')
+                    contains = np.column_stack([
+                        clean_articles.str.contains(CLEAN_FEW_SHOT[example_index], regex=False)
+                        .fillna(False).to_numpy(dtype=bool)
+                        for example_index in remaining
+                    ])
+                    
+                    # Walk the matching articles in file order; an article is kept
+                    # if it holds an example not found yet, and is matched to the
+                    # first such example only, so any other example it holds is
+                    # still looked for in later articles
+                    matched_rows = np.flatnonzero(contains.any(axis=1))
+                    matches = processed_df.iloc[matched_rows]
+                    found_here = set()
+                    for row, row_contains in zip(matches[ARTICLE_COLUMNS].to_dict('records'), contains[matched_rows]):
+                        new_examples = [example_index for example_index, hit in zip(remaining, row_contains)
+                                        if hit and example_index not in found_here]
+                        if not new_examples:
+                            continue
+                        example_text = FEW_SHOT_EXAMPLES[new_examples[0]]
+                        found_examples.append({**row, 'matched_example': example_text})
+                        messages.append(f"Found few-shot example in {city}: {example_text[:100]}...")
+                        found_here.add(new_examples[0])
+                    
+                    remaining = [example_index for example_index in remaining if example_index not in found_here]
+                    if not remaining:
+                        break
+        except Exception as e:
+            messages.append(f"Error reading processed articles for {city}: {e}")
+            return found_examples, messages, False
+    
+    return found_examples, messages, True
+
+def _few_shot_cache_key(processed_path):
+    """Return the cache key of a processed file, or None if it cannot be stat-ed."""
+    try:
+        file_stat = os.stat(processed_path)
+    except OSError:
+        return None
+    # The examples and columns are part of the key, so editing them invalidates old results
+    return (os.path.realpath(processed_path), file_stat.st_mtime_ns, file_stat.st_size,
+            CLEAN_FEW_SHOT, tuple(ARTICLE_COLUMNS), FEW_SHOT_CACHE_VERSION)
+
+def _load_few_shot_cache(cache_file):
+    """Load the few-shot cache, starting empty if it is missing or unreadable."""
+    if not os.path.isfile(cache_file):
+        return {}
+    try:
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable few-shot cache {cache_file}: {e}")
+        return {}
+
+def _save_few_shot_cache(cache, cache_file):
+    """Write the few-shot cache, replacing the old file only once the new one is complete."""
+    try:
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+        tmp_file = f"{cache_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        print(f"Could not write few-shot cache {cache_file}: {e}")
+
+def find_few_shot_examples_in_articles(base_data_dir='data', city_files=None, cache_file=FEW_SHOT_CACHE_FILE):
     """Search for the few-shot examples in processed articles across all cities."""
     found_examples = []
+    if city_files is None:
+        city_files = discover_city_files(base_data_dir)
     
-    for city, city_dir in CITY_MAP.items():
-        news_dir = os.path.join(base_data_dir, city_dir, 'newspaper')
-        processed_path = os.path.join(news_dir, f'{city_dir}_processed_articles_deidentified.csv')
-        
-        if os.path.isfile(processed_path):
-            try:
-                processed_df = pd.read_csv(processed_path)
-                if not processed_df.empty:
-                    for _, row in processed_df.iterrows():
-                        article_text = row['Deidentified_paragraph_text']
-                        for example_text in FEW_SHOT_EXAMPLES:
-                            # Clean both texts for comparison (remove extra whitespace, normalize)
-                            clean_article = ' '.join(article_text.split())
-                            clean_example = ' '.join(example_text.split())
-                            
-                            if clean_example in clean_article:
-                                found_examples.append({
-                                    'city': row['city'],
-                                    'article_date': row['article_date'],
-                                    'article_source': row['article_source'],
-                                    'city_source': row['city_source'],
-                                    'keywords_matched': row['keywords_matched'],
-                                    'Deidentified_article_title': row['Deidentified_article_title'],
-                                    'Deidentified_paragraph_text': article_text,
-                                    'matched_example': example_text
-                                })
-                                print(f"Found few-shot example in {city}: {example_text[:100]}...")
-                                break  # Found this example, move to next article
-            except Exception as e:
-                print(f"Error reading processed articles for {city}: {e}")
+    # Look every existing file up in the cache; only the misses are scanned
+    cache = _load_few_shot_cache(cache_file) if cache_file else {}
+    keys = [_few_shot_cache_key(files['processed_path']) if files['processed_exists'] else None
+            for files in city_files]
+    to_scan = [files for files, key in zip(city_files, keys) if key not in cache]
+    
+    # Cities are scanned on a thread pool; results and messages are
+    # collected here in city order
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(to_scan)))) as executor:
+        scanned = iter(executor.map(_scan_city_few_shot, to_scan))
+        cache_changed = False
+        for files, key in zip(city_files, keys):
+            if key in cache:
+                print(f"Using cached few-shot search results for {files['city']}")
+                city_examples, messages = cache[key]
+            else:
+                city_examples, messages, complete = next(scanned)
+                if key is not None and complete:
+                    # Drop results for older versions of the same file
+                    for old_key in [old_key for old_key in cache if old_key[0] == key[0]]:
+                        del cache[old_key]
+                    cache[key] = (city_examples, messages)
+                    cache_changed = True
+            for message in messages:
+                print(message)
+            found_examples.extend(city_examples)
+    
+    if cache_file and cache_changed:
+        _save_few_shot_cache(cache, cache_file)
     
     return found_examples
 
+def _sample_city(files, samples_per_city):
+    """Read and sample one city's processed articles, returning the samples, article count and status messages."""
+    city = files['city']
+    messages = [f"\nProcessing {city}..."]
+    processed_count = 0
+    
+    # Check for processed articles
+    processed_df = None
+    if files['processed_exists']:
+        try:
+            processed_df = read_csv_columns(files['processed_path'], ARTICLE_COLUMNS, ARTICLE_DTYPES)
+            if not processed_df.empty:
+                processed_count = len(processed_df)
+                messages.append(f"  Found {len(processed_df)} processed articles")
+        except Exception as e:
+            messages.append(f"Error reading processed articles for {city}: {e}")
+    
+    # Check for Reddit comments
+    reddit_comments = []
+    if files['reddit_exists']:
+        try:
+            # Only the comment column is used; a callable usecols leaves a
+            # file without it as an empty frame instead of raising
+            reddit_df = read_csv_columns(files['reddit_path'], lambda column: column == 'Deidentified_Comment')
+            if 'Deidentified_Comment' in reddit_df.columns and not reddit_df.empty:
+                reddit_comments = reddit_df['Deidentified_Comment'].dropna().tolist()
+                messages.append(f"  Found {len(reddit_comments)} Reddit comments")
+        except Exception as e:
+            messages.append(f"Error reading Reddit comments for {city}: {e}")
+    
+    # Sample from processed articles
+    city_samples = []
+    
+    # Sample from processed articles
+    if processed_df is not None and not processed_df.empty:
+        article_sample_size = min(samples_per_city, len(processed_df))
+        if article_sample_size > 0:
+            # Draw the row positions with the city's own generator, so the
+            # draw does not depend on which thread samples the city, then
+            # project the sampled rows straight to dicts instead of one Series per row
+            sample_rows = city_rng(city).choice(len(processed_df), size=article_sample_size, replace=False)
+            city_samples = processed_df.take(sample_rows)[ARTICLE_COLUMNS].to_dict('records')
+    
+    if city_samples:
+        messages.append(f"  Sampled {len(city_samples)} items for {city}")
+    else:
+        messages.append(f"  No samples collected for {city}")
+    
+    return city_samples, processed_count, messages
+
+def _save_output(df, csv_path, output_format='csv'):
+    """Save df to csv_path and/or the same path with a .parquet extension, returning the saved paths."""
+    paths = []
+    if output_format in ('csv', 'both'):
+        df.to_csv(csv_path, index=False)
+        paths.append(csv_path)
+    if output_format in ('parquet', 'both'):
+        parquet_path = os.path.splitext(csv_path)[0] + '.parquet'
+        if write_parquet(df, parquet_path):
+            paths.append(parquet_path)
+    return paths
+
 def sample_news_with_processed_articles(base_data_dir='data', samples_per_city=50, 
                                       output_file='gold_standard/sampled_lexisnexis_news.csv',
-                                      few_shot_file='gold_standard/few_shot_news_examples.csv'):
+                                      few_shot_file='gold_standard/few_shot_news_examples.csv',
+                                      few_shot_cache_file=FEW_SHOT_CACHE_FILE, output_format='csv',
+                                      city_map=CITY_MAP):
     """Sample LexisNexis news articles from processed deidentified articles."""
     
     # Search for few-shot examples in processed articles
     print("Searching for few-shot examples in processed articles...")
-    few_shot_examples = find_few_shot_examples_in_articles(base_data_dir)
+    # Every city's paths are built and checked once, for both passes
+    city_files = discover_city_files(base_data_dir, city_map)
+    few_shot_examples = find_few_shot_examples_in_articles(base_data_dir, city_files, few_shot_cache_file)
     print(f"Found {len(few_shot_examples)} few-shot examples in processed articles")
     
     # Save few-shot examples if found
     if few_shot_examples:
         few_shot_df = pd.DataFrame(few_shot_examples)
-        few_shot_df.to_csv(few_shot_file, index=False)
-        print(f"Few-shot examples saved to {few_shot_file}")
+        saved = _save_output(few_shot_df, few_shot_file, output_format)
+        if saved:
+            print(f"Few-shot examples saved to {' and '.join(saved)}")
     else:
         print("No few-shot examples found in processed articles")
     
     all_samples = []
     total_processed = 0
-    total_reddit = 0
-    
-    for city, city_dir in CITY_MAP.items():
-        print(f"\nProcessing {city}...")
-        
-        # Check for processed articles
-        news_dir = os.path.join(base_data_dir, city_dir, 'newspaper')
-        processed_path = os.path.join(news_dir, f'{city_dir}_processed_articles_deidentified.csv')
-        
-        processed_df = None
-        if os.path.isfile(processed_path):
-            try:
-                processed_df = pd.read_csv(processed_path)
-                if not processed_df.empty:
-                    total_processed += len(processed_df)
-                    print(f"  Found {len(processed_df)} processed articles")
-            except Exception as e:
-                print(f"Error reading processed articles for {city}: {e}")
-        
-        # Check for Reddit comments
-        reddit_dir = os.path.join(base_data_dir, city_dir, 'reddit')
-        reddit_path = os.path.join(reddit_dir, 'filtered_comments_deidentified.csv')
-        
-        reddit_comments = []
-        if os.path.isfile(reddit_path):
-            try:
-                reddit_df = pd.read_csv(reddit_path)
-                if 'Deidentified_Comment' in reddit_df.columns and not reddit_df.empty:
-                    reddit_comments = reddit_df['Deidentified_Comment'].dropna().tolist()
-                    total_reddit += len(reddit_comments)
-                    print(f"  Found {len(reddit_comments)} Reddit comments")
-            except Exception as e:
-                print(f"Error reading Reddit comments for {city}: {e}")
-        
-        # Sample from processed articles
-        city_samples = []
-        
-        # Sample from processed articles
-        if processed_df is not None and not processed_df.empty:
-            article_sample_size = min(samples_per_city, len(processed_df))
-            if article_sample_size > 0:
-                sampled_rows = processed_df.sample(n=article_sample_size, random_state=42)
-                for _, row in sampled_rows.iterrows():
-                    city_samples.append({
-                        'city': row['city'],
-                        'article_date': row['article_date'],
-                        'article_source': row['article_source'],
-                        'city_source': row['city_source'],
-                        'keywords_matched': row['keywords_matched'],
-                        'Deidentified_article_title': row['Deidentified_article_title'],
-                        'Deidentified_paragraph_text': row['Deidentified_paragraph_text']
-                    })
-        
-        if city_samples:
+    
+    # Cities are read and sampled on a thread pool; messages are printed
+    # here in city order
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(city_files)))) as executor:
+        results = executor.map(lambda files: _sample_city(files, samples_per_city), city_files)
+        for city_samples, processed_count, messages in results:
+            for message in messages:
+                print(message)
             all_samples.extend(city_samples)
-            print(f"  Sampled {len(city_samples)} items for {city}")
-        else:
-            print(f"  No samples collected for {city}")
+            total_processed += processed_count
     
     # Combine all samples
     if all_samples:
         combined_df = pd.DataFrame(all_samples)
-        combined_df.to_csv(output_file, index=False)
-        print(f"\nLexisNexis news sample saved to {output_file}")
+        saved = _save_output(combined_df, output_file, output_format)
+        if saved:
+            print(f"\nLexisNexis news sample saved to {' and '.join(saved)}")
         print(f"Total samples: {len(combined_df)}")
+        # The breakdowns count a handful of distinct values, so count them as categoricals
+        for col in ('city', 'article_source', 'city_source'):
+            combined_df[col] = combined_df[col].astype('category')
         print(f"Breakdown by article_source:")
         print(combined_df['article_source'].value_counts())
         print(f"Breakdown by city:")
@@ -189,23 +361,26 @@ def parse_arguments():
     parser.add_argument('--output-dir', default='gold_standard',
                        help='Output directory (default: gold_standard)')
     
+    parser.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv',
+                       help='Output format of the samples; parquet requires pyarrow (default: csv)')
+    
+    parser.add_argument('--no-cache', action='store_true',
+                       help=f'Search every processed file again instead of reusing results cached in {FEW_SHOT_CACHE_FILE}')
+    
     return parser.parse_args()
 
 if __name__ == '__main__':
     args = parse_arguments()
     
-    # Set random seed for reproducibility
-    random.seed(42)
-    
     # Create output directories
     create_output_directories([args.output_dir])
     
     # Determine cities to process
     if args.cities:
-        cities_to_process = [city.strip() for city in args.cities.split(',')]
+        wanted = {city.strip().lower() for city in args.cities.split(',')}
         # Filter CITY_MAP to only include specified cities
         filtered_city_map = {city: city_dir for city, city_dir in CITY_MAP.items() 
-                           if city.lower() in [c.lower() for c in cities_to_process]}
+                           if city.lower() in wanted}
         if not filtered_city_map:
             print(f"No valid cities found in: {args.cities}")
             exit(1)
@@ -228,5 +403,8 @@ if __name__ == '__main__':
         base_data_dir=args.data_dir,
         samples_per_city=args.samples_per_city,
         output_file=output_file,
-        few_shot_file=few_shot_file
+        few_shot_file=few_shot_file,
+        few_shot_cache_file=None if args.no_cache else FEW_SHOT_CACHE_FILE,
+        output_format=args.format,
+        city_map=CITY_MAP_TO_USE
     ) 
\ No newline at end of file
@@ -7,7 +7,12 @@ import urllib.parse
 from datetime import datetime
 from tqdm import tqdm
 import time
+import threading
 import re
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 
 KEYWORDS = [
@@ -29,6 +34,37 @@ CITY_MAP = {
     'el paso': 'elpaso',
 }
 
+# Errors a missing, malformed or badly encoded data file raises while it is
+# read. These are reported and the file is skipped; anything else is a bug
+# and is left to propagate.
+READ_ERRORS = (pd.errors.ParserError, pd.errors.EmptyDataError, OSError, UnicodeDecodeError)
+
+# Errors to_parquet raises when no engine is installed or a column cannot be
+# stored (pyarrow's ArrowInvalid and ArrowTypeError derive from ValueError and TypeError)
+PARQUET_ERRORS = (ImportError, OSError, ValueError, TypeError)
+
+def write_parquet(df, path):
+    """Write df as snappy-compressed Parquet, returning whether it was written."""
+    # Parquet needs pyarrow (or fastparquet), which is only required when asked for
+    try:
+        df.to_parquet(path, compression='snappy', index=False)
+        return True
+    except PARQUET_ERRORS as e:
+        print(f"Error writing {path}: {e}")
+        return False
+
+def city_rng(city):
+    """Return a random generator seeded for one city, the same on every run."""
+    # Each city gets its own child stream of seed 42 (as SeedSequence.spawn
+    # would hand out), so cities do not all draw the same key sequence
+    return np.random.default_rng(np.random.SeedSequence(42, spawn_key=(list(CITY_MAP).index(city),)))
+
+def read_csv_columns(path, columns, dtypes=None, chunksize=None):
+    """Read only the given columns of a CSV file, optionally as an iterator of chunks."""
+    # The C parser over a memory-mapped file skips the buffered read copy;
+    # parsing stays in pandas so values come back exactly as they always have
+    return pd.read_csv(path, usecols=columns, dtype=dtypes, engine='c', memory_map=True, chunksize=chunksize)
+
 def load_spacy_model():
     try:
         # Load English language model
@@ -40,100 +76,192 @@ def load_spacy_model():
         subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
         return spacy.load("en_core_web_sm")
 
-def deidentify_text(text, nlp=None):
-    if not isinstance(text, str):
-        return ""
+# Domain-specific location and institution patterns. Their matches can never
+# overlap a match of another pattern that starts earlier, so they are fused into
+# one case-insensitive alternation that replaces, in a single pass, exactly
+# what applying them one after another would. Every pattern starts at a word
+# boundary, which is hoisted out of the alternation together with a lookahead
+# on the letters the patterns can start with, so most positions in the text
+# are rejected before any branch is tried.
+LOCATION_PATTERNS = [
+    (r'(?:St\.|Saint)\s+[A-Za-z]+\s+(?:County|Parish|City|Town)\b', '[LOCATION]'),
+    (r'(?:Low|High)\s+Barrier\s+(?:Homeless|Housing)\s+Shelter\b', '[INSTITUTION]'),
+    (r'(?:Homeless|Housing)\s+Shelter\b', '[INSTITUTION]'),
+    (r'(?:Community|Resource)\s+Center\b', '[INSTITUTION]'),
+    (r'(?:Public|Private)\s+(?:School|University|College)\b', '[INSTITUTION]'),
+    (r'(?:Medical|Health)\s+Center\b', '[INSTITUTION]'),
+    (r'(?:Police|Fire)\s+Department\b', '[INSTITUTION]'),
+    (r'(?:City|County|State)\s+Hall\b', '[INSTITUTION]'),
+    (r'(?:Public|Private)\s+(?:Library|Park|Garden)\b', '[INSTITUTION]'),
+    (r'(?:Shopping|Retail)\s+Mall\b', '[INSTITUTION]'),
+    (r'(?:Bus|Train|Subway)\s+Station\b', '[INSTITUTION]'),
+    (r'(?:Airport|Harbor|Port)\b', '[INSTITUTION]'),
+    (r'(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
+]
+LOCATION_RE = re.compile(r'\b(?=[abcdfhlmprstw])(?:'
+                         + '|'.join(f'(?P<g{i}>{pattern})' for i, (pattern, _) in enumerate(LOCATION_PATTERNS))
+                         + ')', re.IGNORECASE)
+LOCATION_LABELS = {f'g{i}': replacement for i, (_, replacement) in enumerate(LOCATION_PATTERNS)}
+
+# Multi-word street names. They only ever see text in which the bare street
+# words have already been replaced, so they stay separate passes after the
+# alternation to keep that order.
+STREET_NAME_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in [
+        (r'\b(?:North|South|East|West|N|S|E|W)\s+(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
+        (r'\b(?:First|Second|Third|Fourth|Fifth|Sixth|Seventh|Eighth|Ninth|Tenth)\s+(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
+        (r'\b(?:Main|Broad|Market|Park|Church|School|College|University|Hospital|Library)\s+(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
+    ]
+]
+
+# Any match of a pattern that needs a digit contains a match of this. \d also
+# matches non-ASCII digits, so plain '0'-'9' literals would not be a safe gate
+DIGIT_RE = re.compile(r'\d')
+
+# Patterns for emails, phones, etc. These overlap (a local phone number inside
+# an international one, a URL and its path), so they are applied in order.
+# Each carries literals one of which every match contains (None for a pattern
+# that only needs a digit); a pattern is only run when one is in the text, so
+# most short texts skip most of the scans.
+PII_PATTERNS = [
+    (re.compile(pattern), replacement, literals) for pattern, replacement, literals in [
+        (r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', '[PHONE]', None),
+        (r'\+\d{1,2}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', '[PHONE]', ('+',)),
+        (r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}', '[PHONE]', None),
+        (r'\(\d{3}\)\s*\d{3}[-.\s]?\d{4}', '[PHONE]', ('(',)),
+        (r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^\s]*)?', '[URL]', ('http',)),
+        (r'www\.(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^\s]*)?', '[URL]', ('www.',)),
+        (r'(?:[-\w.]|(?:%[\da-fA-F]{2}))+\.(?:com|org|net|edu|gov|mil|biz|info|mobi|name|aero|asia|jobs|museum)(?:/[^\s]*)?', '[URL]',
+         ('.com', '.org', '.net', '.edu', '.gov', '.mil', '.biz', '.info', '.mobi', '.name', '.aero', '.asia', '.jobs', '.museum')),
+        (r'\[URL\](?:/[^\s]*)?', '[URL]', ('[URL]',)),
+        (r'\[URL\]/search\?[^\s]*', '[URL]', ('[URL]/search?',)),
+        (r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', ('@',)),
+        (r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', '[IP]', None),
+        (r'\b\d{5}(?:-\d{4})?\b', '[ZIP]', None),
+        (r'\b\d{1,2}/\d{1,2}/\d{2,4}\b', '[DATE]', ('/',)),
+        (r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? \d{4}\b', '[DATE]', None),
+    ]
+]
+
+# Clean-up of any remaining URL-like or location patterns, applied in order
+# and gated on literals the same way
+CLEANUP_PATTERNS = [
+    (re.compile(r'\[URL\]/[^\s]+'), '[URL]', ('[URL]/',)),
+    (re.compile(r'\[URL\]\[URL\]'), '[URL]', ('[URL][URL]',)),
+    (re.compile(r'\[LOCATION\]/[^\s]+'), '[LOCATION]', ('[LOCATION]/',)),
+    (re.compile(r'\[LOCATION\]\[LOCATION\]'), '[LOCATION]', ('[LOCATION][LOCATION]',)),
+    (re.compile(r'\[([^\]]+)\]\([^)]+\)'), r'\1', ('](',)),
+]
+
+# Labels for the spaCy entity types that are replaced
+ENTITY_LABELS = {
+    'PERSON': '[PERSON]',
+    'GPE': '[LOCATION]',
+    'LOC': '[LOCATION]',
+    'ORG': '[ORGANIZATION]',
+    'DATE': '[DATE]',
+    'TIME': '[TIME]',
+}
+
+USERNAME_RE = re.compile(r'@[A-Za-z0-9_]+')
+# Address-like patterns (number + street name + [STREET]), e.g. 123 Main Street
+STREET_ADDRESS_RE = re.compile(r'\b\d{1,5}\s+(?:[NESW]\.?\s+)?[A-Za-z0-9.\'-]+(?:\s+[A-Za-z0-9.\'-]+)*\s+\[STREET\]')
+# Common address forms like 123 W. 5th Ave, etc.
+SUFFIX_ADDRESS_RE = re.compile(r'\b\d{1,5}\s+(?:[NESW]\.?\s+)?[A-Za-z0-9.\'-]+(?:\s+[A-Za-z0-9.\'-]+)*\s+(Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Place|Pl|Court|Ct|Circle|Way)\b', re.IGNORECASE)
+
+# Shared instances, created on first use and reused for every text
+_deidentifier = None
+_nlp = None
+
+def _get_deidentifier():
+    """Return the shared Deidentifier, creating it on first use."""
+    global _deidentifier
+    if _deidentifier is None:
+        _deidentifier = Deidentifier()
+    return _deidentifier
+
+def _get_nlp():
+    """Return the shared spaCy model, loading it on first use."""
+    global _nlp
+    if _nlp is None:
+        _nlp = load_spacy_model()
+    return _nlp
+
+def _prepare_text(text):
+    """Run pydeidentify and the address patterns, producing the text spaCy sees."""
     # First, use pydeidentify
-    deidentifier = Deidentifier()
-    text = str(deidentifier.deidentify(text))  # Convert DeidentifiedText to string
+    text = str(_get_deidentifier().deidentify(text))  # Convert DeidentifiedText to string
     
     # Replace @usernames with [USER]
-    text = re.sub(r'@[A-Za-z0-9_]+', '[USER]', text)
+    text = USERNAME_RE.sub('[USER]', text)
     # Replace address-like patterns (number + street name + [STREET])
-    # e.g., 123 Main Street
-    text = re.sub(r'\b\d{1,5}\s+(?:[NESW]\.?\s+)?[A-Za-z0-9.\'-]+(?:\s+[A-Za-z0-9.\'-]+)*\s+\[STREET\]', '[ADDRESS]', text)
+    text = STREET_ADDRESS_RE.sub('[ADDRESS]', text)
     # Also catch common address forms like 123 W. 5th Ave, etc.
-    text = re.sub(r'\b\d{1,5}\s+(?:[NESW]\.?\s+)?[A-Za-z0-9.\'-]+(?:\s+[A-Za-z0-9.\'-]+)*\s+(Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Place|Pl|Court|Ct|Circle|Way)\b', '[ADDRESS]', text, flags=re.IGNORECASE)
-    
-    # Then, apply custom regex/spaCy logic for further deidentification
-    if nlp is None:
-        import spacy
-        nlp = spacy.load("en_core_web_sm")
-    
-    # Process text with spaCy
-    doc = nlp(text)
+    text = SUFFIX_ADDRESS_RE.sub('[ADDRESS]', text)
+    return text
+
+def _finish_text(text, doc):
+    """Apply the location, entity and PII replacements to a prepared text and its spaCy doc."""
     deidentified = text
     
-    # Custom patterns for domain-specific terms
-    location_patterns = [
-        (r'\b(?:St\.|Saint)\s+[A-Za-z]+\s+(?:County|Parish|City|Town)\b', '[LOCATION]'),
-        (r'\b(?:Low|High)\s+Barrier\s+(?:Homeless|Housing)\s+Shelter\b', '[INSTITUTION]'),
-        (r'\b(?:Homeless|Housing)\s+Shelter\b', '[INSTITUTION]'),
-        (r'\b(?:Community|Resource)\s+Center\b', '[INSTITUTION]'),
-        (r'\b(?:Public|Private)\s+(?:School|University|College)\b', '[INSTITUTION]'),
-        (r'\b(?:Medical|Health)\s+Center\b', '[INSTITUTION]'),
-        (r'\b(?:Police|Fire)\s+Department\b', '[INSTITUTION]'),
-        (r'\b(?:City|County|State)\s+Hall\b', '[INSTITUTION]'),
-        (r'\b(?:Public|Private)\s+(?:Library|Park|Garden)\b', '[INSTITUTION]'),
-        (r'\b(?:Shopping|Retail)\s+Mall\b', '[INSTITUTION]'),
-        (r'\b(?:Bus|Train|Subway)\s+Station\b', '[INSTITUTION]'),
-        (r'\b(?:Airport|Harbor|Port)\b', '[INSTITUTION]'),
-        (r'\b(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
-        (r'\b(?:North|South|East|West|N|S|E|W)\s+(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
-        (r'\b(?:First|Second|Third|Fourth|Fifth|Sixth|Seventh|Eighth|Ninth|Tenth)\s+(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
-        (r'\b(?:Main|Broad|Market|Park|Church|School|College|University|Hospital|Library)\s+(?:Street|Avenue|Road|Boulevard|Drive|Lane|Place|Court|Circle|Way)\b', '[STREET]'),
-    ]
-    
-    # Apply location patterns first
-    for pattern, replacement in location_patterns:
-        deidentified = re.sub(pattern, replacement, deidentified, flags=re.IGNORECASE)
+    # Apply location patterns first, all of them in one pass
+    deidentified = LOCATION_RE.sub(lambda match: LOCATION_LABELS[match.lastgroup], deidentified)
+    for pattern, replacement in STREET_NAME_PATTERNS:
+        deidentified = pattern.sub(replacement, deidentified)
     
-    # Replace named entities
+    # Replace named entities. Each replace covers every occurrence of the
+    # surface form, so later mentions of the same form are skipped instead of
+    # rescanning the text; only a form that a label could spell out again
+    # (one with a bracket, or part of a label) is replaced every time.
+    replaced = set()
     for ent in doc.ents:
-        if ent.label_ in ['PERSON', 'GPE', 'LOC', 'ORG', 'DATE', 'TIME']:
-            if ent.label_ == 'PERSON':
-                replacement = '[PERSON]'
-            elif ent.label_ in ['GPE', 'LOC']:
-                replacement = '[LOCATION]'
-            elif ent.label_ == 'ORG':
-                replacement = '[ORGANIZATION]'
-            elif ent.label_ == 'DATE':
-                replacement = '[DATE]'
-            elif ent.label_ == 'TIME':
-                replacement = '[TIME]'
-            deidentified = deidentified.replace(ent.text, replacement)
-    
-    # Additional patterns for emails, phones, etc.
-    patterns = {
-        r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}': '[PHONE]',
-        r'\+\d{1,2}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}': '[PHONE]',
-        r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}': '[PHONE]',
-        r'\(\d{3}\)\s*\d{3}[-.\s]?\d{4}': '[PHONE]',
-        r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^\s]*)?': '[URL]',
-        r'www\.(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^\s]*)?': '[URL]',
-        r'(?:[-\w.]|(?:%[\da-fA-F]{2}))+\.(?:com|org|net|edu|gov|mil|biz|info|mobi|name|aero|asia|jobs|museum)(?:/[^\s]*)?': '[URL]',
-        r'\[URL\](?:/[^\s]*)?': '[URL]',
-        r'\[URL\]/search\?[^\s]*': '[URL]',
-        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b': '[EMAIL]',
-        r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b': '[IP]',
-        r'\b\d{5}(?:-\d{4})?\b': '[ZIP]',
-        r'\b\d{1,2}/\d{1,2}/\d{2,4}\b': '[DATE]',
-        r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? \d{4}\b': '[DATE]',
-    }
+        replacement = ENTITY_LABELS.get(ent.label_)
+        if replacement is None or ent.text in replaced:
+            continue
+        deidentified = deidentified.replace(ent.text, replacement)
+        if ('[' not in ent.text and ']' not in ent.text
+                and not any(ent.text in label for label in ENTITY_LABELS.values())):
+            replaced.add(ent.text)
     
     # Apply additional patterns
-    for pattern, replacement in patterns.items():
-        deidentified = re.sub(pattern, replacement, deidentified)
+    for pattern, replacement, literals in PII_PATTERNS:
+        if (DIGIT_RE.search(deidentified) if literals is None
+                else any(literal in deidentified for literal in literals)):
+            deidentified = pattern.sub(replacement, deidentified)
     
     # Clean up any remaining URL-like or location patterns
-    deidentified = re.sub(r'\[URL\]/[^\s]+', '[URL]', deidentified)
-    deidentified = re.sub(r'\[URL\]\[URL\]', '[URL]', deidentified)
-    deidentified = re.sub(r'\[LOCATION\]/[^\s]+', '[LOCATION]', deidentified)
-    deidentified = re.sub(r'\[LOCATION\]\[LOCATION\]', '[LOCATION]', deidentified)
-    deidentified = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', deidentified)
+    for pattern, replacement, literals in CLEANUP_PATTERNS:
+        if any(literal in deidentified for literal in literals):
+            deidentified = pattern.sub(replacement, deidentified)
     
     return deidentified
 
+def deidentify_text(text, nlp=None):
+    if not isinstance(text, str):
+        return ""
+    text = _prepare_text(text)
+    
+    # Then, apply custom regex/spaCy logic for further deidentification
+    if nlp is None:
+        nlp = _get_nlp()
+    
+    # Process text with spaCy
+    return _finish_text(text, nlp(text))
+
+def deidentify_texts(texts, nlp=None, batch_size=256, n_process=1):
+    """Deidentify many texts, running spaCy over them in batches; yields results in order."""
+    if nlp is None:
+        nlp = _get_nlp()
+    texts = list(texts)
+    # Non-string values come out empty, as with deidentify_text, and are not sent to spaCy
+    prepared = [_prepare_text(text) for text in texts if isinstance(text, str)]
+    docs = zip(prepared, nlp.pipe(prepared, batch_size=batch_size, n_process=n_process))
+    for text in texts:
+        if isinstance(text, str):
+            yield _finish_text(*next(docs))
+        else:
+            yield ""
+
 class LexisNexisAPI:
     """
     Class to interact with the LexisNexis API.
@@ -146,22 +274,31 @@ class LexisNexisAPI:
         self.secret = secret
         self.token = None
         self.headers = None
+        # One session for every request, so connections are kept alive and
+        # reused instead of a new TCP and TLS handshake per page
+        self.session = requests.Session()
+        # Pages are fetched on worker threads, which may all try to refresh
+        # the token at once; only one refresh runs at a time
+        self._token_lock = threading.Lock()
         self._refresh_token()
 
-    def _refresh_token(self):
-        """Get a new authorization token."""
-        auth_url = 'https://auth-api.lexisnexis.com/oauth/v2/token'
-        payload = 'grant_type=client_credentials&scope=http%3a%2f%2foauth.lexisnexis.com%2fall'
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        r = requests.post(auth_url, auth=HTTPBasicAuth(self.client_id, self.secret), 
-                         headers=headers, data=payload)
-        self.token = r.json()['access_token']
-        self.headers = {
-            'Accept': 'application/json;odata.metadata=minimal',
-            'Connection': 'Keep-Alive',
-            'Host': 'services-api.lexisnexis.com',
-            'Authorization': f'Bearer {self.token}'
-        }
+    def _refresh_token(self, stale_token=None):
+        """Get a new authorization token, unless stale_token has already been replaced by another thread."""
+        with self._token_lock:
+            if stale_token is not None and self.token != stale_token:
+                return
+            auth_url = 'https://auth-api.lexisnexis.com/oauth/v2/token'
+            payload = 'grant_type=client_credentials&scope=http%3a%2f%2foauth.lexisnexis.com%2fall'
+            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+            r = self.session.post(auth_url, auth=HTTPBasicAuth(self.client_id, self.secret), 
+                             headers=headers, data=payload)
+            self.token = r.json()['access_token']
+            self.headers = {
+                'Accept': 'application/json;odata.metadata=minimal',
+                'Connection': 'Keep-Alive',
+                'Host': 'services-api.lexisnexis.com',
+                'Authorization': f'Bearer {self.token}'
+            }
 
     def _build_url(self, content='News', query='', skip=0, expand='Document', top=50, filter=None):
         """Build the URL for the API request."""
@@ -181,7 +318,7 @@ class LexisNexisAPI:
         url = self._build_url(query=query, top=1, filter=filter)
         retry_count = 0
         while retry_count < max_retries:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, headers=self.headers)
             if response.status_code == 200:
                 return response.json().get('@odata.count', 0)
             print(f"[ERROR] Status code: {response.status_code}")
@@ -199,75 +336,103 @@ class LexisNexisAPI:
             break
         return 0
 
-    def search_articles(self, query, filter=None, batch_size=50, max_retries=3):
+    def search_articles(self, query, filter=None, batch_size=50, max_retries=3, concurrency=4):
         """Search for articles with pagination and retry logic."""
+        all_articles = []
+        for batch_articles in self.iter_article_batches(query, filter, batch_size, max_retries, concurrency):
+            all_articles.extend(batch_articles)
+        return all_articles
+
+    def _fetch_batch(self, query, filter, offset, batch_size, max_retries):
+        """Fetch one page of search results with retry logic, returning its articles (empty if it failed)."""
+        retry_count = 0
+        while retry_count < max_retries:
+            # The token this attempt is sent with, so a retry only refreshes it
+            # if no other thread has done so in the meantime
+            token = self.token
+            try:
+                url = self._build_url(query=query, skip=offset, top=batch_size, filter=filter)
+                response = self.session.get(url, headers=self.headers)
+                if response.status_code != 200:
+                    print(f"[ERROR] Status code: {response.status_code}")
+                    print(f"[ERROR] Response body: {response.text}")
+                    print(f"[ERROR] Response headers: {response.headers}")
+                    if response.status_code == 429:
+                        print("[ERROR] You have reached the API rate limit! Waiting 60 seconds before retrying...")
+                        time.sleep(60)
+                        continue  # Retry after waiting
+                    print(f"Skipping batch at offset {offset}")
+                    return []
+                data = response.json()
+                return data.get('value', [])
+
+            except requests.exceptions.RequestException as e:
+                retry_count += 1
+                print(f"\nError fetching batch at offset {offset} (attempt {retry_count}/{max_retries}):")
+                print(f"Error: {str(e)}")
+                if retry_count == max_retries:
+                    print(f"Failed to fetch batch after {max_retries} attempts, skipping to next batch")
+                else:
+                    print("Retrying in 5 seconds...")
+                    time.sleep(5)
+                    self._refresh_token(stale_token=token)  # Refresh token on retry
+
+            except Exception as e:
+                print(f"\nAn unexpected error occurred: {str(e)}")
+                return []
+        return []
+
+    def iter_article_batches(self, query, filter=None, batch_size=50, max_retries=3, concurrency=4):
+        """Search like search_articles, yielding each batch's new unique articles as it arrives."""
         total_count = self.get_total_count(query, filter)
         print(f"\nTotal articles available: {total_count}")
 
-        all_articles = []
+        # Only the dedup keys are kept across batches, never the articles
         seen_articles = set()
-        offset = 0
+        unique_count = 0
 
         # Create progress bar
         pbar = tqdm(total=total_count, desc="Fetching articles", unit="articles")
 
-        while offset < total_count:
-            retry_count = 0
-            while retry_count < max_retries:
-                try:
-                    url = self._build_url(query=query, skip=offset, top=batch_size, filter=filter)
-                    response = requests.get(url, headers=self.headers)
-                    if response.status_code != 200:
-                        print(f"[ERROR] Status code: {response.status_code}")
-                        print(f"[ERROR] Response body: {response.text}")
-                        print(f"[ERROR] Response headers: {response.headers}")
-                        if response.status_code == 429:
-                            print("[ERROR] You have reached the API rate limit! Waiting 60 seconds before retrying...")
-                            time.sleep(60)
-                            continue  # Retry after waiting
+        # The total is known up front, so up to `concurrency` pages are
+        # requested at once to overlap their network round trips. Pages are
+        # still deduplicated and handed out in offset order, and no more than
+        # `concurrency` of them are ever held waiting.
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                pending = deque()
+                offsets = iter(range(0, total_count, batch_size))
+                while True:
+                    for offset in offsets:
+                        pending.append(executor.submit(self._fetch_batch, query, filter, offset, batch_size, max_retries))
+                        if len(pending) >= concurrency:
+                            break
+                    if not pending:
                         break
-                    data = response.json()
-                    batch_articles = data.get('value', [])
-
+                    batch_articles = pending.popleft().result()
                     if not batch_articles:
-                        break
+                        continue
 
-                    # Add only unique articles
+                    # Add only unique articles, keyed on (title, date); a tuple
+                    # needs no string built per article, and a '|' in a title
+                    # cannot make two different articles collide
+                    new_articles = []
                     for article in batch_articles:
-                        title = article.get('Title', '')
-                        date = article.get('Date', '')
-                        unique_id = f"{title}|{date}"
-                        if unique_id and unique_id not in seen_articles:
+                        unique_id = (article.get('Title', ''), article.get('Date', ''))
+                        if unique_id not in seen_articles:
                             seen_articles.add(unique_id)
-                            all_articles.append(article)
+                            new_articles.append(article)
+                    unique_count += len(new_articles)
 
                     # Update progress bar
                     pbar.update(len(batch_articles))
-                    pbar.set_postfix({"Unique": len(all_articles)})
-
-                    # Move to next batch
-                    offset += batch_size
-                    break  # Success, exit retry loop
-
-                except requests.exceptions.RequestException as e:
-                    retry_count += 1
-                    print(f"\nError fetching batch at offset {offset} (attempt {retry_count}/{max_retries}):")
-                    print(f"Error: {str(e)}")
-                    if retry_count == max_retries:
-                        print(f"Failed to fetch batch after {max_retries} attempts, skipping to next batch")
-                        offset += batch_size
-                    else:
-                        print("Retrying in 5 seconds...")
-                        time.sleep(5)
-                        self._refresh_token()  # Refresh token on retry
-
-                except Exception as e:
-                    print(f"\nAn unexpected error occurred: {str(e)}")
-                    offset += batch_size
-                    break
-
-        pbar.close()
-        return all_articles
+                    pbar.set_postfix({"Unique": unique_count})
+
+                    # Hand the batch to the caller before more pages are requested
+                    if new_articles:
+                        yield new_articles
+        finally:
+            pbar.close()
 
     def filter_articles_by_date(self, articles, start_date=None, end_date=None):
         """Filter articles by date range."""
@@ -276,34 +441,47 @@ class LexisNexisAPI:
         if not end_date:
             end_date = datetime(2025, 1, 1)
 
-        filtered_articles = []
-        for article in articles:
-            date_str = article.get('Date', '')
+        # Parse every date in one vectorized call; pandas uses the same format
+        # rules as strptime and leaves the dates it cannot parse as NaT
+        date_strs = [article.get('Date', '') for article in articles]
+        dates = pd.to_datetime(pd.Series(date_strs, dtype=object), format='%Y-%m-%dT%H:%M:%SZ', errors='coerce')
+        in_range = ((dates >= start_date) & (dates <= end_date)).tolist()
+
+        # Only the unparsed dates go through strptime, to report why they failed
+        for i in dates.index[dates.isna()]:
+            date_str = date_strs[i]
             try:
                 article_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%SZ')
-                if start_date <= article_date <= end_date:
-                    filtered_articles.append(article)
+                in_range[i] = start_date <= article_date <= end_date
             except (ValueError, TypeError) as e:
                 print(f"Error processing date {date_str}: {str(e)}")
-                continue
 
-        return filtered_articles
+        return [article for article, keep in zip(articles, in_range) if keep]
+
+    def _articles_frame(self, articles):
+        """Build the output rows for articles: title, date, source, city source, summary and full text."""
+        # Flatten one level so Source.Name and Document.Content become columns,
+        # then pick and rename the output fields; fields an article lacks come
+        # out empty
+        fields = {
+            'Title': 'Title',
+            'Date': 'Date',
+            'Source.Name': 'Source',
+            'City Source': 'City Source',
+            'Overview': 'Summary',
+            'Document.Content': 'Full Text',
+        }
+        df = pd.json_normalize(articles, max_level=1).reindex(columns=list(fields))
+        df.columns = list(fields.values())
+        return df
 
     def save_to_csv(self, articles, filename='search_results.csv'):
         """Save articles to a CSV file."""
-        import csv
-        with open(filename, 'w', newline='') as csvfile:
-            fieldnames = ['Title', 'Date', 'Source', 'City Source', 'Summary', 'Full Text']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for article in articles:
-                writer.writerow({
-                    'Title': article.get('Title', ''),
-                    'Date': article.get('Date', ''),
-                    'Source': article.get('Source', {}).get('Name', ''),
-                    'City Source': article.get('City Source', ''),
-                    'Summary': article.get('Overview', ''),
-                    'Full Text': article.get('Document', {}).get('Content', '')
-                })
-        print(f"Results have been written to {filename}") 
\ No newline at end of file
+        # The rows end in \r\n, as csv.DictWriter wrote them
+        self._articles_frame(articles).to_csv(filename, index=False, lineterminator='\r\n')
+        print(f"Results have been written to {filename}") 
+
+    def append_to_csv(self, articles, filename, header=False):
+        """Append articles to a CSV file in save_to_csv's format, starting the file with a header if asked."""
+        self._articles_frame(articles).to_csv(filename, mode='w' if header else 'a', header=header,
+                                              index=False, lineterminator='\r\n')